@@ -1,39 +1,274 @@
 # librerias necesarias 
 
-from fastapi import APIRouter, HTTPException, Query
-from app.models import Payload, BinarySearchPayload
-from app.utils import bubble_sort, filter_even, sum_elements, find_max, binary_search
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from app.binary_io import BINARY_BODY, media_type, read_numbers, respond
+from app.models import Payload, BinarySearchPayload, IndexSearchPayload, BatchPayload, MergePayload
+from app.search_index import index_store
+from app.streaming import (
+    STREAM_MEDIA_TYPES,
+    DuplexStreamingResponse,
+    encode_chunk,
+    encode_error,
+    iter_chunks,
+)
+from app.sort_engine import sort_numbers as run_sort
+from app.utils import (
+    Numbers, filter_even, sum_elements, find_max, fused_reductions,
+    top_k, kth_smallest, percentile, merge_sorted,
+)
 from app.auth import verify_token
+from app.metrics import phase
 
 router = APIRouter()
 
-@router.post("/bubble-sort")
-def sort_numbers(data: Payload, token: str = Query(...)):
-    verify_token(token)
-    return {"numbers": bubble_sort(data.numbers)}
+def authenticate(token: str, request: Optional[Request] = None) -> str:
+    with phase("auth"):
+        # La caché de resultados ya verificó este token en el middleware
+        verified = getattr(request.state, "verified_token", None) if request is not None else None
+        if verified is not None and verified[0] == token:
+            return verified[1]
+        return verify_token(token)
 
-@router.post("/filter-even")
-def filter_numbers(data: Payload, token: str = Query(...)):
-    verify_token(token)
-    return {"even_numbers": filter_even(data.numbers)}
+@router.post("/bubble-sort", openapi_extra=BINARY_BODY)
+def sort_numbers(
+    request: Request,
+    numbers: Numbers = Depends(read_numbers),
+    token: str = Query(...),
+    algorithm: Optional[str] = Query(None),
+):
+    authenticate(token, request)
+    try:
+        with phase("compute"):
+            result = run_sort(numbers, algorithm)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respond(request, {
+        "numbers": result.numbers,
+        "algorithm": result.algorithm,
+        "elapsed_ms": result.elapsed_ms,
+    })
+
+@router.post("/filter-even", openapi_extra=BINARY_BODY)
+def filter_numbers(request: Request, numbers: Numbers = Depends(read_numbers), token: str = Query(...)):
+    authenticate(token, request)
+    with phase("compute"):
+        evens = filter_even(numbers)
+    return respond(request, {"even_numbers": evens})
+
+@router.post("/sum-elements", openapi_extra=BINARY_BODY)
+def sum_numbers(request: Request, numbers: Numbers = Depends(read_numbers), token: str = Query(...)):
+    authenticate(token, request)
+    with phase("compute"):
+        total = sum_elements(numbers)
+    return respond(request, {"sum": total})
+
+@router.post("/max-value", openapi_extra=BINARY_BODY)
+def max_number(request: Request, numbers: Numbers = Depends(read_numbers), token: str = Query(...)):
+    authenticate(token, request)
+    try:
+        with phase("compute"):
+            maximum = find_max(numbers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respond(request, {"max": maximum})
 
-@router.post("/sum-elements")
-def sum_numbers(data: Payload, token: str = Query(...)):
-    verify_token(token)
-    return {"sum": sum_elements(data.numbers)}
+@router.post("/top-k", openapi_extra=BINARY_BODY)
+def top_k_numbers(
+    request: Request,
+    numbers: Numbers = Depends(read_numbers),
+    token: str = Query(...),
+    k: int = Query(..., ge=1),
+):
+    authenticate(token)
+    with phase("compute"):
+        largest = top_k(numbers, k)
+    return respond(request, {"top_k": largest})
+
+@router.post("/kth-element", openapi_extra=BINARY_BODY)
+def kth_number(
+    request: Request,
+    numbers: Numbers = Depends(read_numbers),
+    token: str = Query(...),
+    k: int = Query(..., ge=1),
+):
+    authenticate(token)
+    try:
+        with phase("compute"):
+            value = kth_smallest(numbers, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respond(request, {"value": value, "k": k})
+
+@router.post("/percentile", openapi_extra=BINARY_BODY)
+def percentile_number(
+    request: Request,
+    numbers: Numbers = Depends(read_numbers),
+    token: str = Query(...),
+    p: float = Query(..., ge=0, le=100),
+):
+    authenticate(token)
+    try:
+        with phase("compute"):
+            value = percentile(numbers, p)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respond(request, {"value": value, "percentile": p})
 
-@router.post("/max-value")
-def max_number(data: Payload, token: str = Query(...)):
-    verify_token(token)
+@router.post("/merge-sorted")
+def merge_numbers(data: MergePayload, token: str = Query(...)):
+    authenticate(token)
     try:
-        return {"max": find_max(data.numbers)}
+        with phase("compute"):
+            merged = merge_sorted(data.arrays)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return {"numbers": merged}
 
 @router.post("/binary-search")
 def search_number(data: BinarySearchPayload, token: str = Query(...)):
-    verify_token(token)
-    sorted_list = bubble_sort(data.numbers)
-    index = binary_search(sorted_list, data.target)
+    authenticate(token)
+    with phase("compute"):
+        index = index_store.add(data.numbers).search([data.target])[0]
     found = index != -1
     return {"found": found, "index": index if found else -1}
+
+@router.post("/binary-search/index")
+def create_search_index(data: Payload, token: str = Query(...)):
+    authenticate(token)
+    with phase("compute"):
+        index = index_store.add(data.numbers)
+    return {"index_id": index.index_id, "size": index.size}
+
+@router.post("/binary-search/index/{index_id}")
+def search_in_index(index_id: str, data: IndexSearchPayload, token: str = Query(...)):
+    authenticate(token)
+    index = index_store.get(index_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Índice no encontrado")
+    with phase("compute"):
+        positions = index.search(data.targets)
+    return {
+        "index_id": index_id,
+        "results": [
+            {"target": target, "found": position != -1, "index": position}
+            for target, position in zip(data.targets, positions)
+        ],
+    }
+
+REDUCTION_OPS = {"filter-even", "sum-elements", "max-value"}
+
+@router.post("/batch")
+def run_batch(data: BatchPayload, token: str = Query(...)):
+    authenticate(token)
+    with phase("compute"):
+        return {"results": batch_results(data)}
+
+def batch_results(data: BatchPayload) -> list:
+    numbers = data.numbers
+    requested = {operation.op for operation in data.operations}
+
+    # Las reducciones se calculan juntas en un único recorrido de la lista
+    reductions = None
+    if len(requested & REDUCTION_OPS) > 1:
+        reductions = fused_reductions(numbers)
+
+    # Todas las búsquedas binarias se resuelven en una sola pasada sobre el índice
+    targets = [
+        operation.target
+        for operation in data.operations
+        if operation.op == "binary-search" and operation.target is not None
+    ]
+    positions = iter(index_store.add(numbers).search(targets) if targets else [])
+
+    results = []
+    for operation in data.operations:
+        result = {"op": operation.op}
+        if operation.op == "bubble-sort":
+            try:
+                sorted_result = run_sort(numbers, operation.algorithm)
+                result.update(
+                    numbers=sorted_result.numbers,
+                    algorithm=sorted_result.algorithm,
+                    elapsed_ms=sorted_result.elapsed_ms,
+                )
+            except ValueError as e:
+                result["error"] = str(e)
+        elif operation.op == "filter-even":
+            result["even_numbers"] = (
+                reductions.even_numbers if reductions else filter_even(numbers)
+            )
+        elif operation.op == "sum-elements":
+            result["sum"] = reductions.sum if reductions else sum_elements(numbers)
+        elif operation.op == "max-value":
+            if not numbers:
+                result["error"] = "Lista vacía"
+            else:
+                result["max"] = reductions.max if reductions else find_max(numbers)
+        elif operation.op == "binary-search":
+            if operation.target is None:
+                result["error"] = "binary-search requiere 'target'"
+            else:
+                index = next(positions)
+                result.update(found=index != -1, index=index)
+        results.append(result)
+    return results
+
+@router.post("/stream/sum-elements")
+async def stream_sum_numbers(request: Request, token: str = Query(...)):
+    authenticate(token)
+    total = 0
+    # La fase de cómputo se mide por bloque: la espera del cuerpo no cuenta
+    async for chunk in iter_chunks(request):
+        with phase("compute"):
+            total += sum_elements(chunk)
+    return {"sum": total}
+
+@router.post("/stream/max-value")
+async def stream_max_number(request: Request, token: str = Query(...)):
+    authenticate(token)
+    maximum = None
+    async for chunk in iter_chunks(request):
+        if len(chunk):
+            with phase("compute"):
+                chunk_max = find_max(chunk)
+            maximum = chunk_max if maximum is None else max(maximum, chunk_max)
+    if maximum is None:
+        raise HTTPException(status_code=400, detail="Lista vacía")
+    return {"max": maximum}
+
+@router.post("/stream/filter-even")
+async def stream_filter_numbers(request: Request, token: str = Query(...)):
+    authenticate(token)
+    content_type = media_type(request)
+    if content_type not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail=f"Tipo de contenido no soportado: {content_type}")
+
+    # El primer bloque se lee antes de responder: un cuerpo inválido desde el
+    # principio recibe su 400/413 en lugar de un 200
+    chunks = iter_chunks(request)
+    try:
+        first = [await chunks.__anext__()]
+    except StopAsyncIteration:
+        first = []
+
+    async def remaining():
+        for chunk in first:
+            yield chunk
+        async for chunk in chunks:
+            yield chunk
+
+    # Cada bloque filtrado se envía en cuanto se procesa, en el formato de entrada.
+    # Con las cabeceras ya enviadas, un error posterior viaja como registro de
+    # error al final del stream (ver encode_error)
+    async def even_chunks():
+        try:
+            async for chunk in remaining():
+                with phase("compute"):
+                    evens = filter_even(chunk)
+                if len(evens):
+                    yield encode_chunk(evens, content_type)
+        except HTTPException as error:
+            yield encode_error(error, content_type)
+
+    return DuplexStreamingResponse(even_chunks(), media_type=content_type)
@@ -1,18 +1,109 @@
 # Description: Módulo de autenticación de usuarios
 #librerias necesarias
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Set, Tuple
 from fastapi import APIRouter, HTTPException, Request
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from app.models import UserRegister, Token
+from app.user_store import create_user_store
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Coste de bcrypt y tamaño del pool de hashing, configurables por entorno
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_QUEUE_DEPTH = int(os.getenv("PASSWORD_QUEUE_DEPTH", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
-fake_users_db = {}
+users_db = create_user_store()
+TOKEN_CACHE_SIZE = 10_000
+
+
+class TokenCache:
+    """LRU de tokens ya verificados, indexado por el digest SHA-256 del token.
+
+    Cada entrada caduca en el ``exp`` del propio token y se invalida cuando el
+    usuario se elimina con ``remove_user``.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+        self._by_user: Dict[str, Set[bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, username: str, expires_at: float):
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (username, expires_at)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(username, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_user(self, username: str):
+        with self._lock:
+            for key in self._by_user.pop(username, set()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _discard(self, key: bytes):
+        username, _ = self._entries.pop(key)
+        keys = self._by_user.get(username)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[username]
+
+
+token_cache = TokenCache()
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -20,6 +111,61 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Ejecuta bcrypt en un pool de procesos acotado.
+
+    Admite como máximo ``workers + queue_depth`` operaciones a la vez; por
+    encima de eso rechaza con ``PasswordPoolBusy`` en lugar de encolar.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_depth: int = PASSWORD_QUEUE_DEPTH):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.workers + self.queue_depth:
+                raise PasswordPoolBusy()
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor = self._executor
+        try:
+            future = executor.submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        # El hueco se libera cuando termina el proceso, aunque el cliente se vaya
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.pending -= 1
+
+
+password_hasher = PasswordHasher()
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
@@ -27,28 +173,62 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str):
+    # Un token ya verificado y aún vigente no se vuelve a decodificar
+    username = token_cache.get(token)
+    if username is not None:
+        if username not in users_db:
+            token_cache.invalidate_user(username)
+            raise HTTPException(status_code=401, detail="Usuario inválido")
+        return username
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
-        if username not in fake_users_db:
+        if username not in users_db:
             raise HTTPException(status_code=401, detail="Usuario inválido")
+        if payload.get("exp") is not None:
+            token_cache.put(token, username, float(payload["exp"]))
         return username
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
+def remove_user(username: str):
+    users_db.remove(username)
+    token_cache.invalidate_user(username)
+
+def pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Servicio de contraseñas saturado, reintente más tarde",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register")
-def register(user: UserRegister):
-    if user.username in fake_users_db:
+async def register(user: UserRegister):
+    if user.username in users_db:
+        raise HTTPException(status_code=400, detail="El usuario ya existe")
+    try:
+        hashed_pw = await password_hasher.hash(user.password)
+    except PasswordPoolBusy:
+        raise pool_busy()
+    # Otro registro con el mismo nombre pudo terminar mientras se calculaba el hash
+    if not users_db.add({"username": user.username, "hashed_password": hashed_pw}):
         raise HTTPException(status_code=400, detail="El usuario ya existe")
-    hashed_pw = hash_password(user.password)
-    fake_users_db[user.username] = {"username": user.username, "hashed_password": hashed_pw}
     return {"message": "User registered successfully"}
 
-@router.post("/login")
-def login(user: UserRegister):
-    db_user = fake_users_db.get(user.username)
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+@router.post("/login", response_model=Token)
+async def login(user: UserRegister):
+    db_user = users_db.get(user.username)
+    try:
+        valid = db_user is not None and await password_hasher.verify(
+            user.password, db_user["hashed_password"]
+        )
+    except PasswordPoolBusy:
+        raise pool_busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
     token = create_access_token({"sub": user.username})
-    return {"access_token": token}
+    return Token(access_token=token)
 
+@router.get("/token-cache/stats")
+def token_cache_stats():
+    return token_cache.stats()
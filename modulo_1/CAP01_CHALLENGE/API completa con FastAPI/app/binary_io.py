@@ -0,0 +1,155 @@
+### app/binary_io.py
+# Entrada y salida binaria para los endpoints de algoritmos.
+# Además de JSON se aceptan cuerpos int64 crudos, msgpack y Arrow IPC, que se
+# decodifican a arrays NumPy sin copiar; la respuesta usa el mismo formato.
+
+from typing import Any, Dict
+
+import numpy as np
+from fastapi import HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.models import Payload
+from app.utils import Numbers
+
+try:
+    import msgpack
+except ImportError:  # dependencia opcional
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # dependencia opcional
+    pa = None
+
+JSON = "application/json"
+OCTET_STREAM = "application/octet-stream"
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+BINARY_MEDIA_TYPES = {OCTET_STREAM, MSGPACK, ARROW_STREAM}
+
+# Enteros de 64 bits little-endian, el formato de todos los buffers binarios
+INT64 = np.dtype("<i8")
+INT64_MAX = np.iinfo(np.int64).max
+
+# Documenta en OpenAPI los formatos aceptados por los endpoints binarios
+BINARY_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            JSON: {"schema": Payload.model_json_schema()},
+            OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+            MSGPACK: {"schema": {"type": "string", "format": "binary"}},
+            ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+def media_type(request: Request) -> str:
+    content_type = request.headers.get("content-type", JSON).split(";")[0].strip().lower()
+    return MEDIA_TYPE_ALIASES.get(content_type, content_type)
+
+
+def int64_buffer(buffer: bytes) -> np.ndarray:
+    if len(buffer) % INT64.itemsize:
+        raise HTTPException(status_code=400, detail="El cuerpo no es un buffer de int64")
+    return np.frombuffer(buffer, dtype=INT64)
+
+
+def decode_numbers(body: bytes, content_type: str) -> np.ndarray:
+    if content_type == OCTET_STREAM:
+        return int64_buffer(body)
+    if content_type == MSGPACK:
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="msgpack no está instalado")
+        try:
+            data = msgpack.unpackb(body)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Cuerpo msgpack inválido")
+        # Un bin con int64 se usa sin copiar; una lista de enteros se convierte
+        if isinstance(data, bytes):
+            return int64_buffer(data)
+        if isinstance(data, list) and all(type(x) is int for x in data):
+            try:
+                return np.array(data, dtype=np.int64)
+            except OverflowError:
+                raise HTTPException(status_code=400, detail="Enteros fuera del rango de int64")
+        raise HTTPException(status_code=400, detail="msgpack debe contener una lista de enteros o un bin int64")
+    if content_type == ARROW_STREAM:
+        if pa is None:
+            raise HTTPException(status_code=415, detail="pyarrow no está instalado")
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Cuerpo Arrow IPC inválido")
+        if table.num_columns != 1 or not pa.types.is_integer(table.schema.field(0).type):
+            raise HTTPException(status_code=400, detail="Arrow debe contener una sola columna de enteros")
+        column = table.column(0)
+        if column.null_count:
+            raise HTTPException(status_code=400, detail="La columna Arrow no admite nulos")
+        # uint64 es el único tipo entero que no cabe en int64: astype daría negativos
+        if column.type == pa.uint64() and len(column) and pc.max(column).as_py() > INT64_MAX:
+            raise HTTPException(status_code=400, detail="Enteros fuera del rango de int64")
+        if column.num_chunks == 1 and column.type == pa.int64():
+            return column.chunk(0).to_numpy(zero_copy_only=True)
+        return column.to_numpy().astype(np.int64)
+    raise HTTPException(status_code=415, detail=f"Tipo de contenido no soportado: {content_type}")
+
+
+async def read_numbers(request: Request) -> Numbers:
+    body = await request.body()
+    content_type = media_type(request)
+    if content_type in BINARY_MEDIA_TYPES:
+        return decode_numbers(body, content_type)
+    try:
+        return Payload.model_validate_json(body).numbers
+    except ValidationError as e:
+        errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+        raise RequestValidationError(errors)
+
+
+def encode_scalar(value: Any) -> np.ndarray:
+    try:
+        return np.array([value], dtype=INT64)
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="Resultado fuera del rango de int64, use JSON")
+
+
+def respond(request: Request, result: Dict[str, Any]):
+    """Devuelve el resultado en el mismo formato con el que llegó la petición.
+
+    El primer campo del resultado son los datos; el resto (p. ej. el algoritmo
+    y el tiempo de ordenamiento) viaja como cabeceras ``X-*`` o metadatos.
+    """
+    content_type = media_type(request)
+    if content_type not in BINARY_MEDIA_TYPES:
+        return result
+
+    name, value = next(iter(result.items()))
+    array = value if isinstance(value, np.ndarray) else encode_scalar(value)
+    extras = dict(list(result.items())[1:])
+    headers = {f"X-{key.replace('_', '-').title()}": str(extra) for key, extra in extras.items()}
+
+    if content_type == OCTET_STREAM:
+        content = array.astype(INT64, copy=False).tobytes()
+    elif content_type == MSGPACK:
+        packed = {name: array.astype(INT64, copy=False).tobytes()}
+        packed.update(extras)
+        content = msgpack.packb(packed)
+    else:
+        table = pa.table({name: array.astype(INT64, copy=False)}).replace_schema_metadata(
+            {key: str(extra) for key, extra in extras.items()}
+        )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        content = sink.getvalue().to_pybytes()
+    return Response(content=content, media_type=content_type, headers=headers)
@@ -2,16 +2,52 @@
 # Importamos FastAPI y las rutas de los algoritmos y autenticación
 # app/main.py
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.algorithms import router as algo_router
-from app.auth import router as auth_router
+from app.auth import router as auth_router, password_hasher, token_cache
+from app.metrics import METRICS_ENABLED, MetricsMiddleware, render_metrics
+from app.result_cache import ResultCacheMiddleware, result_cache
 
-app = FastAPI(title="FastAPI Algorithms API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Cierra el pool de procesos de bcrypt al apagar el servidor
+    password_hasher.shutdown()
+
+app = FastAPI(title="FastAPI Algorithms API", lifespan=lifespan)
 
 # Incluir rutas de algoritmos y autenticación
 app.include_router(algo_router)
 app.include_router(auth_router)
 
+# La caché de resultados va por dentro de las métricas para que los aciertos se midan
+app.add_middleware(ResultCacheMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+def metrics():
+    stats = token_cache.stats()
+    return render_metrics([
+        "# HELP auth_token_cache_hits_total Tokens servidos desde la caché.",
+        "# TYPE auth_token_cache_hits_total counter",
+        f"auth_token_cache_hits_total {stats['hits']}",
+        "# HELP auth_token_cache_misses_total Tokens verificados con jwt.decode.",
+        "# TYPE auth_token_cache_misses_total counter",
+        f"auth_token_cache_misses_total {stats['misses']}",
+        "# HELP result_cache_hits_total Respuestas servidas desde la caché de resultados.",
+        "# TYPE result_cache_hits_total counter",
+        f"result_cache_hits_total {result_cache.hits}",
+        "# HELP result_cache_misses_total Respuestas calculadas con la caché de resultados activa.",
+        "# TYPE result_cache_misses_total counter",
+        f"result_cache_misses_total {result_cache.misses}",
+        "# HELP result_cache_bytes Bytes de respuesta guardados en la caché de resultados.",
+        "# TYPE result_cache_bytes gauge",
+        f"result_cache_bytes {result_cache.total_bytes}",
+    ])
+
 @app.get("/", tags=["Root"])
 def read_root():
     return {"message": "API funcionando correctamente"}
@@ -0,0 +1,171 @@
+### app/metrics.py
+# Métricas de la API en formato de texto de Prometheus.
+#
+# MetricsMiddleware mide cada petición (latencia y tamaño del cuerpo) y los
+# endpoints marcan sus fases con ``phase("auth")`` y ``phase("compute")``.
+# Con eso la petición se reparte en cuatro fases:
+#   parse      desde que llega la petición hasta la primera fase marcada
+#              (lectura del cuerpo y validación de Pydantic)
+#   auth       verificación del token
+#   compute    el algoritmo
+#   serialize  desde el fin de la última fase hasta enviar la respuesta
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    """Histogramas con el mismo nombre y distintas etiquetas."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.histograms: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            histogram = self.histograms.get(labels)
+            if histogram is None:
+                histogram = self.histograms[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(h.counts), h.sum, h.count) for labels, h in self.histograms.items()]
+        for labels, counts, total, count in sorted(items):
+            base = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+request_latency = HistogramFamily(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+request_size = HistogramFamily(
+    "http_request_size_bytes", "Tamaño del cuerpo de las peticiones HTTP.",
+    ("method", "route"), SIZE_BUCKETS,
+)
+phase_latency = HistogramFamily(
+    "http_request_phase_seconds", "Duración de cada fase (parse, auth, compute, serialize) por endpoint.",
+    ("route", "phase"), LATENCY_BUCKETS,
+)
+FAMILIES = [request_latency, request_size, phase_latency]
+
+
+class RequestTimer:
+    __slots__ = ("start", "first_mark", "last_mark", "phases")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.first_mark: Optional[float] = None
+        self.last_mark: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    if timer.first_mark is None:
+        timer.first_mark = start
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        timer.phases[name] = timer.phases.get(name, 0.0) + end - start
+        timer.last_mark = end
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: no envuelve la respuesta, solo observa los mensajes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timer = RequestTimer(start)
+        token = _current_timer.set(timer)
+        body_size = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body_size += len(message.get("body", b""))
+            return message
+
+        async def status_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, status_send)
+        finally:
+            _current_timer.reset(token)
+            end = time.perf_counter()
+            route = scope.get("route")
+            path = getattr(route, "path", "<unmatched>")
+            method = scope["method"]
+            request_latency.observe((method, path, str(status)), end - start)
+            request_size.observe((method, path), body_size)
+            if timer.first_mark is not None:
+                phase_latency.observe((path, "parse"), timer.first_mark - start)
+                for name, duration in timer.phases.items():
+                    phase_latency.observe((path, name), duration)
+                phase_latency.observe((path, "serialize"), end - timer.last_mark)
+
+
+def render_metrics(extra_lines: Sequence[str] = ()) -> str:
+    lines: List[str] = []
+    for family in FAMILIES:
+        lines.extend(family.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
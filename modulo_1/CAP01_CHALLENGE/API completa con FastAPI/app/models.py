@@ -1,7 +1,7 @@
 ### app/models.py
 
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
 class UserRegister(BaseModel):
     username: str
@@ -16,4 +16,19 @@ class Payload(BaseModel):
 
 class BinarySearchPayload(BaseModel):
     numbers: List[int]
-    target: int
\ No newline at end of file
+    target: int
+
+class MergePayload(BaseModel):
+    arrays: List[List[int]]
+
+class IndexSearchPayload(BaseModel):
+    targets: List[int]
+
+class BatchOperation(BaseModel):
+    op: Literal["bubble-sort", "filter-even", "sum-elements", "max-value", "binary-search"]
+    target: Optional[int] = None
+    algorithm: Optional[str] = None
+
+class BatchPayload(BaseModel):
+    numbers: List[int]
+    operations: List[BatchOperation]
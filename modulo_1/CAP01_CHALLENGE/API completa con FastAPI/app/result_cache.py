@@ -0,0 +1,227 @@
+### app/result_cache.py
+# Memoización de resultados para los endpoints deterministas.
+#
+# El resultado de /bubble-sort, /sum-elements, /max-value y /filter-even
+# depende solo del cuerpo de la petición (y del parámetro ``algorithm``), así
+# que la respuesta ya serializada se guarda bajo un hash del cuerpo. Una
+# petición repetida no se parsea, no se calcula y no se vuelve a serializar.
+# El hash viaja como ETag: con ``If-None-Match`` se responde 304 sin cuerpo.
+#
+# Un acierto devuelve el mismo cuerpo (el ETag lo exige), así que un
+# ``elapsed_ms`` en él es el del cálculo original: la respuesta lo indica con
+# ``X-Cache: HIT`` y la cabecera ``Age``, y no lleva ``X-Elapsed-Ms``, que
+# describiría un cálculo que no se ha hecho.
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException
+
+from app.auth import verify_token
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "0") in ("1", "true", "True")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+MEMOIZED_PATHS = {"/bubble-sort", "/sum-elements", "/max-value", "/filter-even"}
+# Parámetros de consulta que no cambian el resultado
+IGNORED_PARAMS = {"token"}
+# Cabeceras de la respuesta original que no se repiten en un acierto
+NOT_REPLAYED_HEADERS = {b"etag", b"x-cache", b"x-elapsed-ms"}
+
+
+class CachedResponse(NamedTuple):
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    route: object
+    stored_at: float
+
+
+class ResultCache:
+    """LRU acotado por número de entradas y por bytes de respuesta guardados."""
+
+    def __init__(self, enabled: bool = RESULT_CACHE_ENABLED, max_entries: int = RESULT_CACHE_SIZE,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= len(previous.body)
+        self._entries[key] = entry
+        self.total_bytes += len(entry.body)
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= len(evicted.body)
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+result_cache = ResultCache()
+
+
+def result_key(scope, body: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(scope["path"].encode("utf-8"))
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"))
+        if name not in IGNORED_PARAMS
+    )
+    digest.update(repr(params).encode("utf-8"))
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            digest.update(value.split(b";")[0].strip().lower())
+    digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate.startswith(b"W/"):
+            candidate = candidate[2:]
+        if candidate in (etag, b"*"):
+            return True
+    return False
+
+
+def authorized(scope) -> bool:
+    """Verifica el token de la petición y deja el resultado en ``request.state``.
+
+    El endpoint lo reutiliza (ver ``algorithms.authenticate``) en lugar de
+    verificar el mismo token otra vez.
+    """
+    token = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))).get("token")
+    if token is None:
+        return False
+    try:
+        username = verify_token(token)
+    except HTTPException:
+        return False
+    scope.setdefault("state", {})["verified_token"] = (token, username)
+    return True
+
+
+class ResultCacheMiddleware:
+    """Sirve respuestas memoizadas antes de llegar al router.
+
+    Solo actúa sobre ``MEMOIZED_PATHS`` con un token válido; cualquier otro
+    caso (token inválido, errores, otros endpoints) pasa intacto a la app.
+    """
+
+    def __init__(self, app, cache: ResultCache = result_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.cache.enabled
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in MEMOIZED_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        body = bytes(body)
+
+        if not authorized(scope):
+            await self.app(scope, replay(body, receive), send)
+            return
+
+        key = result_key(scope, body)
+        etag = f'"{key}"'.encode("ascii")
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match")
+        # El resultado es función del hash: si el cliente ya tiene este ETag,
+        # no hace falta ni buscarlo en la caché
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag)]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            scope["route"] = cached.route
+            age = str(int(time.monotonic() - cached.stored_at)).encode("ascii")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": cached.headers + [(b"etag", etag), (b"x-cache", b"HIT"), (b"age", age)],
+            })
+            await send({"type": "http.response.body", "body": cached.body})
+            return
+
+        start_message = {}
+        chunks = []
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+                if message["status"] == 200:
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers", [])) + [(b"etag", etag), (b"x-cache", b"MISS")],
+                    }
+            elif message["type"] == "http.response.body" and start_message.get("status") == 200:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    headers = [
+                        (name, value) for name, value in start_message.get("headers", [])
+                        if name.lower() not in NOT_REPLAYED_HEADERS
+                    ]
+                    self.cache.put(
+                        key, CachedResponse(headers, b"".join(chunks), scope.get("route"), time.monotonic())
+                    )
+            await send(message)
+
+        await self.app(scope, replay(body, receive), capture_send)
+
+
+def replay(body: bytes, receive):
+    """Devuelve un ``receive`` que entrega de nuevo el cuerpo ya leído."""
+    sent = False
+
+    async def replay_receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay_receive
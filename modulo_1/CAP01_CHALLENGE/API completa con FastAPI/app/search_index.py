@@ -0,0 +1,95 @@
+### app/search_index.py
+# Índices ordenados reutilizables para búsqueda binaria.
+# Una lista se ordena una sola vez, se guarda bajo un identificador derivado
+# de su contenido y luego admite muchas búsquedas (vectorizadas) sin reordenar.
+
+import hashlib
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from app.sort_engine import fits_int64, sort_numbers
+
+MAX_INDEXES = 128
+
+
+def content_hash(numbers: List[int]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    if numbers and fits_int64(min(numbers), max(numbers)):
+        digest.update(np.fromiter(numbers, dtype=np.int64, count=len(numbers)).tobytes())
+    else:
+        digest.update(repr(numbers).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_sorted(numbers: List[int]) -> bool:
+    return all(numbers[i] <= numbers[i + 1] for i in range(len(numbers) - 1))
+
+
+class SortedIndex:
+    def __init__(self, index_id: str, numbers: List[int]):
+        self.index_id = index_id
+        self.size = len(numbers)
+        sorted_numbers = numbers if is_sorted(numbers) else sort_numbers(numbers).numbers
+        # Enteros fuera de int64 no caben en NumPy: se busca con bisect
+        if sorted_numbers and fits_int64(sorted_numbers[0], sorted_numbers[-1]):
+            self.values = np.asarray(sorted_numbers, dtype=np.int64)
+        else:
+            self.values = sorted_numbers
+
+    def search(self, targets: List[int]) -> List[int]:
+        """Devuelve la posición de cada objetivo en la lista ordenada, o -1."""
+        if isinstance(self.values, np.ndarray) and targets and fits_int64(min(targets), max(targets)):
+            wanted = np.asarray(targets, dtype=np.int64)
+            positions = np.searchsorted(self.values, wanted, side="left")
+            clipped = np.minimum(positions, self.size - 1)
+            found = (positions < self.size) & (self.values[clipped] == wanted)
+            return np.where(found, positions, -1).tolist()
+        values = self.values.tolist() if isinstance(self.values, np.ndarray) else self.values
+        results = []
+        for target in targets:
+            position = bisect_left(values, target)
+            found = position < self.size and values[position] == target
+            results.append(position if found else -1)
+        return results
+
+
+class IndexStore:
+    """LRU acotado de índices ordenados, seguro entre hilos del threadpool."""
+
+    def __init__(self, max_indexes: int = MAX_INDEXES):
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, SortedIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, numbers: List[int]) -> SortedIndex:
+        index_id = content_hash(numbers)
+        with self._lock:
+            index = self._indexes.get(index_id)
+            if index is not None:
+                self._indexes.move_to_end(index_id)
+                return index
+        index = SortedIndex(index_id, numbers)
+        with self._lock:
+            self._indexes[index_id] = index
+            self._indexes.move_to_end(index_id)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def get(self, index_id: str) -> Optional[SortedIndex]:
+        with self._lock:
+            index = self._indexes.get(index_id)
+            if index is not None:
+                self._indexes.move_to_end(index_id)
+            return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+index_store = IndexStore()
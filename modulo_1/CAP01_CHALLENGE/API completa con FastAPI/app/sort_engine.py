@@ -0,0 +1,106 @@
+### app/sort_engine.py
+# Motor de ordenamiento: varios algoritmos y una estrategia que elige
+# uno por petición según el tamaño de la lista y el rango de valores.
+
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from app.utils import Numbers
+
+# Por debajo de este tamaño el coste de convertir a NumPy supera la ganancia
+SMALL_INPUT_SIZE = 512
+# Rango máximo (max - min) para que el radix sort se resuelva en una sola pasada
+RADIX_MAX_SPAN = 1 << 16
+RADIX_DIGIT_BITS = 16
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+class SortResult(NamedTuple):
+    numbers: Numbers
+    algorithm: str
+    elapsed_ms: float
+
+
+def fits_int64(low: int, high: int) -> bool:
+    return INT64_MIN <= low and high <= INT64_MAX
+
+
+def as_int64_array(numbers: Numbers, algorithm: str) -> np.ndarray:
+    if isinstance(numbers, np.ndarray):
+        return numbers
+    if not fits_int64(min(numbers), max(numbers)):
+        raise ValueError(f"{algorithm} requiere enteros dentro del rango de int64")
+    return np.fromiter(numbers, dtype=np.int64, count=len(numbers))
+
+
+def timsort(numbers: Numbers) -> Numbers:
+    if isinstance(numbers, np.ndarray):
+        return np.asarray(sorted(numbers.tolist()), dtype=np.int64)
+    return sorted(numbers)
+
+
+def radix_sort(numbers: Numbers) -> Numbers:
+    # LSD radix sort con dígitos de 16 bits; cada pasada es un argsort
+    # estable de NumPy, que para claves uint16 usa internamente radix sort.
+    if len(numbers) == 0:
+        return numbers[:0]
+    array = as_int64_array(numbers, "radix")
+    # Invertir el bit de signo conserva el orden al pasar a uint64
+    keys = array.view(np.uint64) ^ np.uint64(1 << 63)
+    keys -= keys.min()
+    span = int(keys.max())
+    order = np.arange(len(array))
+    shift = 0
+    while True:
+        digits = ((keys[order] >> np.uint64(shift)) & np.uint64(RADIX_MAX_SPAN - 1)).astype(np.uint16)
+        order = order[np.argsort(digits, kind="stable")]
+        shift += RADIX_DIGIT_BITS
+        if span >> shift == 0:
+            break
+    result = array[order]
+    return result if isinstance(numbers, np.ndarray) else result.tolist()
+
+
+def numpy_sort(numbers: Numbers) -> Numbers:
+    if len(numbers) == 0:
+        return numbers[:0]
+    result = np.sort(as_int64_array(numbers, "numpy"))
+    return result if isinstance(numbers, np.ndarray) else result.tolist()
+
+
+SORT_ALGORITHMS: Dict[str, Callable[[Numbers], Numbers]] = {
+    "timsort": timsort,
+    "radix": radix_sort,
+    "numpy": numpy_sort,
+}
+
+
+def choose_algorithm(numbers: Numbers) -> str:
+    if len(numbers) < SMALL_INPUT_SIZE:
+        return "timsort"
+    if isinstance(numbers, np.ndarray):
+        low, high = int(numbers.min()), int(numbers.max())
+    else:
+        low, high = min(numbers), max(numbers)
+    if not fits_int64(low, high):
+        return "timsort"
+    if high - low < RADIX_MAX_SPAN:
+        return "radix"
+    return "numpy"
+
+
+def sort_numbers(numbers: Numbers, algorithm: Optional[str] = None) -> SortResult:
+    if algorithm is None:
+        algorithm = choose_algorithm(numbers)
+    elif algorithm not in SORT_ALGORITHMS:
+        raise ValueError(
+            f"Algoritmo desconocido '{algorithm}', opciones: {', '.join(SORT_ALGORITHMS)}"
+        )
+    start = time.perf_counter()
+    result = SORT_ALGORITHMS[algorithm](numbers)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return SortResult(numbers=result, algorithm=algorithm, elapsed_ms=elapsed_ms)
@@ -0,0 +1,127 @@
+### app/streaming.py
+# Lectura incremental del cuerpo para los endpoints en streaming.
+# El cuerpo se consume por bloques, así que la memoria usada depende del
+# tamaño de cada bloque y no del total de la lista.
+#
+# Formatos aceptados:
+# - NDJSON (application/x-ndjson): cada línea es un entero o una lista de enteros.
+# - Bloques binarios (application/vnd.int64-chunks): cada bloque es un uint32
+#   little-endian con la longitud en bytes seguido de esos bytes en int64.
+#
+# Si la respuesta ya empezó (200 enviado), un error al leer el resto del cuerpo
+# se envía como último registro del stream:
+# - NDJSON: una línea {"error": <detalle>, "status": <código>}.
+# - Bloques binarios: la longitud reservada ERROR_CHUNK seguida de un bloque
+#   normal (longitud + bytes) con ese mismo JSON en UTF-8.
+
+import json
+import struct
+from typing import AsyncIterator, Iterator
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.binary_io import INT64, media_type
+from app.utils import Numbers
+
+NDJSON = "application/x-ndjson"
+INT64_CHUNKS = "application/vnd.int64-chunks"
+STREAM_MEDIA_TYPES = {NDJSON, INT64_CHUNKS}
+
+# Tamaño máximo de una línea NDJSON o de un bloque binario
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+CHUNK_HEADER = struct.Struct("<I")
+# Longitud reservada que marca un registro de error en los bloques binarios
+ERROR_CHUNK = 0xFFFFFFFF
+
+
+def parse_ndjson_line(line: bytes) -> Numbers:
+    try:
+        value = json.loads(line)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Línea NDJSON inválida")
+    if type(value) is int:
+        return [value]
+    if isinstance(value, list) and all(type(x) is int for x in value):
+        return value
+    raise HTTPException(status_code=400, detail="Cada línea debe ser un entero o una lista de enteros")
+
+
+def split_ndjson(buffer: bytearray) -> Iterator[Numbers]:
+    while True:
+        end = buffer.find(b"\n")
+        if end == -1:
+            if len(buffer) > MAX_CHUNK_BYTES:
+                raise HTTPException(status_code=413, detail="Línea NDJSON demasiado grande")
+            return
+        line = bytes(buffer[:end]).strip()
+        del buffer[: end + 1]
+        if line:
+            yield parse_ndjson_line(line)
+
+
+def split_int64_chunks(buffer: bytearray) -> Iterator[Numbers]:
+    while len(buffer) >= CHUNK_HEADER.size:
+        (size,) = CHUNK_HEADER.unpack_from(buffer)
+        if size > MAX_CHUNK_BYTES:
+            raise HTTPException(status_code=413, detail="Bloque binario demasiado grande")
+        if size % INT64.itemsize:
+            raise HTTPException(status_code=400, detail="El bloque no es un buffer de int64")
+        end = CHUNK_HEADER.size + size
+        if len(buffer) < end:
+            return
+        chunk = np.frombuffer(bytes(buffer[CHUNK_HEADER.size : end]), dtype=INT64)
+        del buffer[:end]
+        yield chunk
+
+
+async def iter_chunks(request: Request) -> AsyncIterator[Numbers]:
+    content_type = media_type(request)
+    if content_type == NDJSON:
+        split = split_ndjson
+    elif content_type == INT64_CHUNKS:
+        split = split_int64_chunks
+    else:
+        raise HTTPException(status_code=415, detail=f"Tipo de contenido no soportado: {content_type}")
+
+    buffer = bytearray()
+    async for data in request.stream():
+        buffer += data
+        for chunk in split(buffer):
+            yield chunk
+
+    if content_type == NDJSON and buffer.strip():
+        yield parse_ndjson_line(bytes(buffer).strip())
+    elif content_type == INT64_CHUNKS and buffer:
+        raise HTTPException(status_code=400, detail="Bloque binario incompleto")
+
+
+def encode_chunk(chunk: Numbers, content_type: str) -> bytes:
+    if content_type == INT64_CHUNKS:
+        data = np.asarray(chunk, dtype=INT64).tobytes()
+        return CHUNK_HEADER.pack(len(data)) + data
+    values = chunk.tolist() if isinstance(chunk, np.ndarray) else chunk
+    return json.dumps(values).encode("utf-8") + b"\n"
+
+
+def encode_error(error: HTTPException, content_type: str) -> bytes:
+    data = json.dumps({"error": error.detail, "status": error.status_code}).encode("utf-8")
+    if content_type == INT64_CHUNKS:
+        return CHUNK_HEADER.pack(ERROR_CHUNK) + CHUNK_HEADER.pack(len(data)) + data
+    return data + b"\n"
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse que puede seguir leyendo el cuerpo de la petición.
+
+    Con ASGI < 2.4, StreamingResponse lanza una tarea que consume ``receive()``
+    para detectar la desconexión y le roba los bloques del cuerpo al generador.
+    Aquí el propio generador lee ``request.stream()``, que ya detecta la
+    desconexión del cliente.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
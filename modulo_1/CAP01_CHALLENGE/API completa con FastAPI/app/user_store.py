@@ -0,0 +1,137 @@
+### app/user_store.py
+# Almacenes de usuarios intercambiables: en memoria (un solo proceso) o
+# SQLite (compartido entre varios workers de uvicorn en la misma máquina).
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+USER_STORE = os.getenv("USER_STORE", "memory")
+USER_DB_PATH = os.getenv("USER_DB_PATH", "users.db")
+# Segundos que un usuario leído de SQLite se sirve desde la caché del proceso
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "5"))
+USER_CACHE_SIZE = 10_000
+
+
+class UserStore(ABC):
+    @abstractmethod
+    def get(self, username: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def add(self, user: dict) -> bool:
+        """Guarda el usuario; devuelve False si ya existía."""
+
+    @abstractmethod
+    def remove(self, username: str) -> bool:
+        pass
+
+    def __contains__(self, username: str) -> bool:
+        return self.get(username) is not None
+
+
+class InMemoryUserStore(UserStore):
+    def __init__(self):
+        self._users: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[dict]:
+        return self._users.get(username)
+
+    def add(self, user: dict) -> bool:
+        with self._lock:
+            if user["username"] in self._users:
+                return False
+            self._users[user["username"]] = user
+            return True
+
+    def remove(self, username: str) -> bool:
+        with self._lock:
+            return self._users.pop(username, None) is not None
+
+
+class SQLiteUserStore(UserStore):
+    """Usuarios en SQLite (modo WAL) con una conexión por hilo y caché de lectura.
+
+    Solo se cachean usuarios existentes y durante ``cache_ttl`` segundos, así
+    que un registro en otro worker se ve de inmediato y un borrado tarda como
+    mucho ``cache_ttl`` en propagarse.
+    """
+
+    GET_USER = "SELECT username, hashed_password FROM users WHERE username = ?"
+    INSERT_USER = "INSERT INTO users (username, hashed_password) VALUES (?, ?)"
+    DELETE_USER = "DELETE FROM users WHERE username = ?"
+
+    def __init__(self, path: str = USER_DB_PATH, cache_ttl: float = USER_CACHE_TTL,
+                 cache_size: int = USER_CACHE_SIZE):
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._cache: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, hashed_password TEXT NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 reutiliza las sentencias preparadas de cada conexión
+        # (cached_statements), por eso las consultas son constantes de clase
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, cached_statements=64)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, username: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(username)
+            if cached is not None and cached[1] > now:
+                self._cache.move_to_end(username)
+                return cached[0]
+        row = self._connection().execute(self.GET_USER, (username,)).fetchone()
+        if row is None:
+            self._evict(username)
+            return None
+        user = {"username": row[0], "hashed_password": row[1]}
+        with self._lock:
+            self._cache[username] = (user, now + self.cache_ttl)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user
+
+    def add(self, user: dict) -> bool:
+        try:
+            with self._connection() as connection:
+                connection.execute(self.INSERT_USER, (user["username"], user["hashed_password"]))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def remove(self, username: str) -> bool:
+        with self._connection() as connection:
+            deleted = connection.execute(self.DELETE_USER, (username,)).rowcount
+        self._evict(username)
+        return deleted > 0
+
+    def _evict(self, username: str):
+        with self._lock:
+            self._cache.pop(username, None)
+
+
+def create_user_store(kind: str = USER_STORE) -> UserStore:
+    if kind == "memory":
+        return InMemoryUserStore()
+    if kind == "sqlite":
+        return SQLiteUserStore()
+    raise ValueError(f"USER_STORE desconocido: {kind}")
@@ -1,6 +1,33 @@
 ### app/utils.py
 
-from typing import List
+import heapq
+import math
+import os
+import random
+from fractions import Fraction
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+# Las listas llegan como List[int] (JSON) o como arrays int64 (cuerpos binarios)
+Numbers = Union[List[int], np.ndarray]
+
+# Tamaño a partir del cual una List[int] se convierte a NumPy para filtrar,
+# sumar o buscar el máximo. 0 desactiva la conversión: la copia a NumPy cuesta
+# más que la propia operación en Python (ver benchmarks/bench_numpy_crossover.py).
+NUMPY_THRESHOLD = int(os.getenv("NUMPY_THRESHOLD", "0"))
+
+def as_array(numbers: Numbers) -> Optional[np.ndarray]:
+    """Devuelve el array NumPy a usar, o None si conviene el camino en Python."""
+    if isinstance(numbers, np.ndarray):
+        return numbers
+    if NUMPY_THRESHOLD <= 0 or len(numbers) < NUMPY_THRESHOLD:
+        return None
+    try:
+        return np.array(numbers, dtype=np.int64)
+    except OverflowError:
+        # Enteros fuera de int64: solo Python da el resultado exacto
+        return None
 
 def bubble_sort(numbers: List[int]) -> List[int]:
     nums = numbers[:]
@@ -11,16 +38,56 @@ def bubble_sort(numbers: List[int]) -> List[int]:
                 nums[j], nums[j + 1] = nums[j + 1], nums[j]
     return nums
 
-def filter_even(numbers: List[int]) -> List[int]:
-    return [x for x in numbers if x % 2 == 0]
+def filter_even(numbers: Numbers) -> Numbers:
+    array = as_array(numbers)
+    if array is None:
+        return filter_even_list(numbers)
+    evens = filter_even_array(array)
+    return evens if array is numbers else evens.tolist()
 
-def sum_elements(numbers: List[int]) -> int:
-    return sum(numbers)
+def sum_elements(numbers: Numbers) -> int:
+    array = as_array(numbers)
+    return sum(numbers) if array is None else array_sum(array)
 
-def find_max(numbers: List[int]) -> int:
-    if not numbers:
+def find_max(numbers: Numbers) -> int:
+    if len(numbers) == 0:
         raise ValueError("Lista vacía")
-    return max(numbers)
+    array = as_array(numbers)
+    return max(numbers) if array is None else int(array.max())
+
+def filter_even_list(numbers: List[int]) -> List[int]:
+    return [x for x in numbers if x % 2 == 0]
+
+def filter_even_array(array: np.ndarray) -> np.ndarray:
+    return array[(array & 1) == 0]
+
+def array_sum(array: np.ndarray) -> int:
+    # np.sum desborda en silencio en int64: solo se usa si la suma cabe seguro
+    if array.size == 0:
+        return 0
+    bound = max(abs(int(array.min())), abs(int(array.max()))) * array.size
+    if bound < 1 << 63:
+        return int(array.sum())
+    return sum(array.tolist())
+
+class Reductions(NamedTuple):
+    sum: int
+    max: Optional[int]
+    even_numbers: List[int]
+
+def fused_reductions(numbers: List[int]) -> Reductions:
+    # Suma, máximo y filtro de pares en un único recorrido de la lista
+    total = 0
+    maximum = numbers[0] if numbers else None
+    evens = []
+    append_even = evens.append
+    for x in numbers:
+        total += x
+        if x > maximum:
+            maximum = x
+        if not x & 1:
+            append_even(x)
+    return Reductions(sum=total, max=maximum, even_numbers=evens)
 
 def binary_search(numbers: List[int], target: int) -> int:
     left, right = 0, len(numbers) - 1
@@ -33,3 +100,57 @@ def binary_search(numbers: List[int], target: int) -> int:
         else:
             right = mid - 1
     return -1
+
+# ----------- Selección y heaps: top-k, k-ésimo, percentil y merge -----------
+
+def top_k(numbers: Numbers, k: int) -> Numbers:
+    """Los k mayores en orden descendente, en O(n log k)."""
+    if k < 1:
+        raise ValueError("k debe ser mayor que 0")
+    if isinstance(numbers, np.ndarray):
+        if k >= len(numbers):
+            return np.sort(numbers)[::-1]
+        largest = np.partition(numbers, len(numbers) - k)[len(numbers) - k:]
+        return np.sort(largest)[::-1]
+    return heapq.nlargest(k, numbers)
+
+def quickselect(numbers: Numbers, k: int) -> int:
+    """El k-ésimo menor (k desde 0) en tiempo lineal esperado."""
+    if not 0 <= k < len(numbers):
+        raise ValueError(f"k fuera de rango para una lista de {len(numbers)} elementos")
+    if isinstance(numbers, np.ndarray):
+        return int(np.partition(numbers, k)[k])
+    items = numbers
+    while True:
+        pivot = random.choice(items)
+        lows = [x for x in items if x < pivot]
+        if k < len(lows):
+            items = lows
+            continue
+        equal = sum(1 for x in items if x == pivot)
+        if k < len(lows) + equal:
+            return pivot
+        k -= len(lows) + equal
+        items = [x for x in items if x > pivot]
+
+def kth_smallest(numbers: Numbers, k: int) -> int:
+    """El k-ésimo menor con k desde 1."""
+    return quickselect(numbers, k - 1)
+
+def percentile(numbers: Numbers, p: float) -> int:
+    """Percentil por rango más cercano: el menor valor con al menos p% de datos <= él."""
+    if len(numbers) == 0:
+        raise ValueError("Lista vacía")
+    if not 0 <= p <= 100:
+        raise ValueError("El percentil debe estar entre 0 y 100")
+    # Con fracciones exactas: p / 100 en float redondea y ceil salta al rango
+    # siguiente (p=7 con 100 elementos daría 8)
+    rank = max(1, math.ceil(Fraction(str(p)) * len(numbers) / 100))
+    return kth_smallest(numbers, rank)
+
+def merge_sorted(arrays: Sequence[List[int]]) -> List[int]:
+    """Mezcla k listas ya ordenadas con un heap, en O(n log k)."""
+    for array in arrays:
+        if any(array[i] > array[i + 1] for i in range(len(array) - 1)):
+            raise ValueError("Todas las listas deben estar ordenadas de menor a mayor")
+    return list(heapq.merge(*arrays))
@@ -0,0 +1,50 @@
+# Benchmark: logins por segundo según el número de procesos de bcrypt
+#
+# Uso (desde la raíz del proyecto):
+#   python -m benchmarks.bench_login --logins 200 --rounds 10
+
+import argparse
+import asyncio
+import os
+import time
+
+from app.auth import PasswordHasher, pwd_context
+
+
+async def run_logins(hasher: PasswordHasher, hashed: str, logins: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(hasher.verify("clave", hashed) for _ in range(logins)))
+    return logins / (time.perf_counter() - start)
+
+
+def worker_counts(max_workers: int):
+    count = 1
+    while count < max_workers:
+        yield count
+        count *= 2
+    yield max_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logins/seg frente a número de procesos")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=12, help="coste de bcrypt")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # El coste de la verificación lo fija el propio hash
+    hashed = pwd_context.hash("clave", rounds=args.rounds)
+
+    print(f"bcrypt rounds={args.rounds}, logins={args.logins}")
+    print(f"{'procesos':>8}  {'logins/s':>10}")
+    for workers in worker_counts(args.max_workers):
+        hasher = PasswordHasher(workers=workers, queue_depth=args.logins)
+        try:
+            rate = asyncio.run(run_logins(hasher, hashed, args.logins))
+        finally:
+            hasher.shutdown()
+        print(f"{workers:>8}  {rate:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Benchmark: tamaño a partir del cual el camino NumPy de app/utils.py
+# (conversión de la lista incluida) supera al camino en Python puro.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m benchmarks.bench_numpy_crossover --max-exp 20
+#
+# El resultado sugiere un valor para la variable de entorno NUMPY_THRESHOLD.
+
+import argparse
+import random
+import timeit
+
+import numpy as np
+
+from app.utils import array_sum, filter_even_array, filter_even_list
+
+OPERATIONS = {
+    "filter_even": (
+        filter_even_list,
+        lambda numbers: filter_even_array(np.array(numbers, dtype=np.int64)).tolist(),
+    ),
+    "sum_elements": (
+        sum,
+        lambda numbers: array_sum(np.array(numbers, dtype=np.int64)),
+    ),
+    "find_max": (
+        max,
+        lambda numbers: int(np.array(numbers, dtype=np.int64).max()),
+    ),
+}
+
+
+def best_time(func, numbers, repeat: int) -> float:
+    number = max(1, 200_000 // len(numbers))
+    return min(timeit.repeat(lambda: func(numbers), number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Punto de cruce Python/NumPy en app/utils.py")
+    parser.add_argument("--min-exp", type=int, default=4, help="tamaño mínimo 2**min_exp")
+    parser.add_argument("--max-exp", type=int, default=20, help="tamaño máximo 2**max_exp")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sizes = [2 ** exp for exp in range(args.min_exp, args.max_exp + 1)]
+    crossovers = {}
+    print(f"{'operación':<14}{'n':>9}{'python µs':>12}{'numpy µs':>12}")
+    for name, (python_path, numpy_path) in OPERATIONS.items():
+        crossover = None
+        for size in sizes:
+            numbers = [random.randrange(-10**9, 10**9) for _ in range(size)]
+            python_time = best_time(python_path, numbers, args.repeat)
+            numpy_time = best_time(numpy_path, numbers, args.repeat)
+            print(f"{name:<14}{size:>9}{python_time * 1e6:>12.1f}{numpy_time * 1e6:>12.1f}")
+            # El cruce es el primer tamaño desde el que NumPy gana siempre
+            if numpy_time < python_time:
+                crossover = crossover or size
+            else:
+                crossover = None
+        crossovers[name] = crossover
+
+    print()
+    for name, crossover in crossovers.items():
+        print(f"{name:<14} cruce: {crossover if crossover else 'sin cruce en el rango medido'}")
+    if all(crossovers.values()):
+        print(f"NUMPY_THRESHOLD sugerido: {max(crossovers.values())}")
+    else:
+        print("NUMPY_THRESHOLD sugerido: 0 (desactivado)")
+
+
+if __name__ == "__main__":
+    main()
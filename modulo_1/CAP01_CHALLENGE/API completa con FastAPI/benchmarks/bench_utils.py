@@ -0,0 +1,67 @@
+# Micro-benchmarks de app/utils.py y del motor de ordenamiento con pytest-benchmark.
+#
+# No se ejecuta con el `pytest` normal (el archivo no empieza por test_).
+# Uso (desde la raíz del proyecto):
+#   pytest benchmarks/bench_utils.py --benchmark-json=benchmarks/results/utils.json
+#   pytest benchmarks/bench_utils.py --benchmark-autosave --benchmark-compare
+#
+# Con -k se filtra por función o tamaño, p. ej. -k "sum_elements and 1000000".
+
+import random
+
+import pytest
+
+from app.sort_engine import sort_numbers
+from app.utils import (
+    binary_search,
+    bubble_sort,
+    filter_even,
+    find_max,
+    fused_reductions,
+    sum_elements,
+)
+
+SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+# Bubble sort es O(n²): a partir de 10^4 cada ronda tarda segundos
+BUBBLE_SIZES = [10, 100, 1_000]
+
+
+def make_numbers(size: int):
+    rng = random.Random(size)
+    return [rng.randrange(-10**9, 10**9) for _ in range(size)]
+
+
+@pytest.fixture(scope="module", params=SIZES)
+def numbers(request):
+    return make_numbers(request.param)
+
+
+@pytest.mark.parametrize("size", BUBBLE_SIZES)
+def test_bubble_sort(benchmark, size):
+    benchmark(bubble_sort, make_numbers(size))
+
+
+def test_sort_engine(benchmark, numbers):
+    result = benchmark(sort_numbers, numbers)
+    benchmark.extra_info["algorithm"] = result.algorithm
+
+
+def test_filter_even(benchmark, numbers):
+    benchmark(filter_even, numbers)
+
+
+def test_sum_elements(benchmark, numbers):
+    benchmark(sum_elements, numbers)
+
+
+def test_find_max(benchmark, numbers):
+    benchmark(find_max, numbers)
+
+
+def test_fused_reductions(benchmark, numbers):
+    benchmark(fused_reductions, numbers)
+
+
+def test_binary_search(benchmark, numbers):
+    ordered = sorted(numbers)
+    benchmark(binary_search, ordered, ordered[len(ordered) // 3])
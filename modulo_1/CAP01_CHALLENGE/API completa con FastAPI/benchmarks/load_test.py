@@ -0,0 +1,148 @@
+# Prueba de carga en proceso: peticiones ASGI con httpx contra app.main:app,
+# sin levantar uvicorn. Mide latencia p50/p99 y throughput por endpoint y
+# tamaño de payload, y guarda el resultado en JSON.
+#
+# Uso (desde la raíz del proyecto):
+#   python -m benchmarks.load_test --output benchmarks/results/load.json
+#   python -m benchmarks.load_test --baseline benchmarks/results/load.json
+#
+# Con --baseline compara contra una ejecución anterior y termina con código 1
+# si algún p50 empeora más que --tolerance.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from app.auth import password_hasher
+from app.main import app
+
+USER = {"username": "load_test", "password": "load_test"}
+
+
+def endpoints(size: int) -> Dict[str, dict]:
+    rng = random.Random(size)
+    numbers = [rng.randrange(-10**6, 10**6) for _ in range(size)]
+    return {
+        "/bubble-sort": {"numbers": numbers},
+        "/filter-even": {"numbers": numbers},
+        "/sum-elements": {"numbers": numbers},
+        "/max-value": {"numbers": numbers},
+        "/binary-search": {"numbers": numbers, "target": numbers[size // 2]},
+        "/batch": {
+            "numbers": numbers,
+            "operations": [
+                {"op": "sum-elements"},
+                {"op": "max-value"},
+                {"op": "filter-even"},
+                {"op": "binary-search", "target": numbers[0]},
+            ],
+        },
+    }
+
+
+async def run_endpoint(client: httpx.AsyncClient, path: str, body: dict, params: dict,
+                       requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.post(path, json=body, params=params)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(float(p50), 3),
+        "p99_ms": round(float(p99), 3),
+        "throughput_rps": round(requests / elapsed, 1),
+    }
+
+
+async def run(args) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        await client.post("/register", json=USER)
+        login = await run_endpoint(client, "/login", USER, {}, args.login_requests, args.concurrency)
+        results["/login"] = {"0": login}
+        token = (await client.post("/login", json=USER)).json()["access_token"]
+
+        for size in args.sizes:
+            for path, body in endpoints(size).items():
+                # Los payloads grandes tardan mucho en serializarse: menos peticiones
+                requests = max(1, args.requests // 10) if size >= 100_000 else args.requests
+                stats = await run_endpoint(
+                    client, path, body, {"token": token}, requests, args.concurrency
+                )
+                results.setdefault(path, {})[str(size)] = stats
+                print(f"{path:<16}{size:>9}  p50 {stats['p50_ms']:>9.2f} ms  "
+                      f"p99 {stats['p99_ms']:>9.2f} ms  {stats['throughput_rps']:>8.1f} req/s")
+    print(f"{'/login':<16}{'-':>9}  p50 {login['p50_ms']:>9.2f} ms  "
+          f"p99 {login['p99_ms']:>9.2f} ms  {login['throughput_rps']:>8.1f} req/s")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    regressions = []
+    for path, sizes in results.items():
+        for size, stats in sizes.items():
+            previous = baseline.get(path, {}).get(size)
+            if previous is None:
+                continue
+            ratio = stats["p50_ms"] / previous["p50_ms"] if previous["p50_ms"] else 1.0
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{path} n={size}: p50 {previous['p50_ms']} -> {stats['p50_ms']} ms (x{ratio:.2f})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga ASGI en proceso")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 100_000])
+    parser.add_argument("--requests", type=int, default=200, help="peticiones por endpoint y tamaño")
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="empeoramiento admitido del p50")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        password_hasher.shutdown()
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESIÓN {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,17 @@
 
 # tests/test_algorithms.py
 
+import json
+import struct
+
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
+from app import utils
 from app.main import app
+from app.auth import verify_token
+from app.result_cache import result_cache
+from app.utils import filter_even, find_max, percentile, sum_elements
 
 client = TestClient(app)
 
@@ -33,6 +41,47 @@ def test_bubble_sort():
 
     assert response.status_code == 200
     assert response.json()["numbers"] == [1, 2, 5, 9]
+    assert response.json()["algorithm"] == "timsort"
+    assert response.json()["elapsed_ms"] >= 0
+
+
+# ----------- TEST: Ordenar forzando cada algoritmo -----------
+@pytest.mark.parametrize("algorithm", ["timsort", "radix", "numpy"])
+def test_sort_forced_algorithm(algorithm):
+    token = get_token()
+    payload = {"numbers": [5, -2, 9, 1, 70000, -2]}
+    response = client.post(
+        "/bubble-sort", json=payload, params={"token": token, "algorithm": algorithm}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["numbers"] == [-2, -2, 1, 5, 9, 70000]
+    assert response.json()["algorithm"] == algorithm
+
+
+# ----------- TEST: Ordenar listas grandes elige un motor NumPy -----------
+def test_sort_large_input_strategy():
+    token = get_token()
+    bounded = [(i * 7919) % 1000 for i in range(5000)]
+    response = client.post("/bubble-sort", json={"numbers": bounded}, params={"token": token})
+    assert response.json()["algorithm"] == "radix"
+    assert response.json()["numbers"] == sorted(bounded)
+
+    wide = [(i * 7919) % 1000 * 10**9 for i in range(5000)]
+    response = client.post("/bubble-sort", json={"numbers": wide}, params={"token": token})
+    assert response.json()["algorithm"] == "numpy"
+    assert response.json()["numbers"] == sorted(wide)
+
+
+# ----------- TEST: Ordenar con algoritmo desconocido -----------
+def test_sort_unknown_algorithm():
+    token = get_token()
+    payload = {"numbers": [3, 1, 2]}
+    response = client.post(
+        "/bubble-sort", json=payload, params={"token": token, "algorithm": "quantum"}
+    )
+
+    assert response.status_code == 400
 
 
 # ----------- TEST: Filtrar números pares -----------
@@ -85,3 +134,444 @@ def test_binary_search_not_found():
     assert response.status_code == 200
     assert response.json()["found"] is False
     assert response.json()["index"] == -1
+
+
+# ----------- TEST: Busqueda binaria sobre un indice reutilizable -----------
+def test_binary_search_index():
+    token = get_token()
+    payload = {"numbers": [9, 3, 7, 1, 5]}
+    response = client.post("/binary-search/index", json=payload, params={"token": token})
+
+    assert response.status_code == 200
+    index_id = response.json()["index_id"]
+    assert response.json()["size"] == 5
+
+    # El mismo contenido produce el mismo identificador
+    again = client.post("/binary-search/index", json=payload, params={"token": token})
+    assert again.json()["index_id"] == index_id
+
+    response = client.post(
+        f"/binary-search/index/{index_id}",
+        json={"targets": [5, 8, 1, 9]},
+        params={"token": token},
+    )
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"target": 5, "found": True, "index": 2},
+        {"target": 8, "found": False, "index": -1},
+        {"target": 1, "found": True, "index": 0},
+        {"target": 9, "found": True, "index": 4},
+    ]
+
+
+# ----------- TEST: Busqueda binaria con indice inexistente -----------
+def test_binary_search_index_not_found():
+    token = get_token()
+    response = client.post(
+        "/binary-search/index/no-existe", json={"targets": [1]}, params={"token": token}
+    )
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Índice no encontrado"
+
+
+# ----------- TEST: Varias operaciones en una sola peticion -----------
+def test_batch_operations():
+    token = get_token()
+    payload = {
+        "numbers": [5, 2, 9, 4, 7],
+        "operations": [
+            {"op": "sum-elements"},
+            {"op": "max-value"},
+            {"op": "filter-even"},
+            {"op": "binary-search", "target": 7},
+            {"op": "binary-search", "target": 3},
+            {"op": "bubble-sort", "algorithm": "numpy"},
+        ],
+    }
+    response = client.post("/batch", json=payload, params={"token": token})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0] == {"op": "sum-elements", "sum": 27}
+    assert results[1] == {"op": "max-value", "max": 9}
+    assert results[2] == {"op": "filter-even", "even_numbers": [2, 4]}
+    assert results[3] == {"op": "binary-search", "found": True, "index": 3}
+    assert results[4] == {"op": "binary-search", "found": False, "index": -1}
+    assert results[5]["numbers"] == [2, 4, 5, 7, 9]
+    assert results[5]["algorithm"] == "numpy"
+
+
+# ----------- TEST: Errores por operacion en el batch -----------
+def test_batch_operation_errors():
+    token = get_token()
+    payload = {
+        "numbers": [],
+        "operations": [{"op": "max-value"}, {"op": "sum-elements"}, {"op": "binary-search"}],
+    }
+    response = client.post("/batch", json=payload, params={"token": token})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0] == {"op": "max-value", "error": "Lista vacía"}
+    assert results[1] == {"op": "sum-elements", "sum": 0}
+    assert results[2] == {"op": "binary-search", "error": "binary-search requiere 'target'"}
+
+
+# ----------- TEST: Entrada y salida binaria int64 -----------
+def test_octet_stream_roundtrip():
+    token = get_token()
+    body = np.array([5, -2, 9, 4], dtype="<i8").tobytes()
+    headers = {"Content-Type": "application/octet-stream"}
+
+    response = client.post("/bubble-sort", content=body, headers=headers, params={"token": token})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert np.frombuffer(response.content, dtype="<i8").tolist() == [-2, 4, 5, 9]
+    assert response.headers["x-algorithm"] == "timsort"
+
+    response = client.post("/filter-even", content=body, headers=headers, params={"token": token})
+    assert np.frombuffer(response.content, dtype="<i8").tolist() == [-2, 4]
+
+    response = client.post("/sum-elements", content=body, headers=headers, params={"token": token})
+    assert np.frombuffer(response.content, dtype="<i8").tolist() == [16]
+
+    response = client.post("/max-value", content=body, headers=headers, params={"token": token})
+    assert np.frombuffer(response.content, dtype="<i8").tolist() == [9]
+
+
+# ----------- TEST: Buffer binario mal formado -----------
+def test_octet_stream_invalid_length():
+    token = get_token()
+    response = client.post(
+        "/sum-elements",
+        content=b"\x01\x02\x03",
+        headers={"Content-Type": "application/octet-stream"},
+        params={"token": token},
+    )
+    assert response.status_code == 400
+
+
+# ----------- TEST: Entrada y salida msgpack -----------
+def test_msgpack_roundtrip():
+    msgpack = pytest.importorskip("msgpack")
+    token = get_token()
+    response = client.post(
+        "/filter-even",
+        content=msgpack.packb([1, 2, 3, 4]),
+        headers={"Content-Type": "application/msgpack"},
+        params={"token": token},
+    )
+    assert response.status_code == 200
+    data = msgpack.unpackb(response.content)
+    assert np.frombuffer(data["even_numbers"], dtype="<i8").tolist() == [2, 4]
+
+
+# ----------- TEST: Entrada y salida Arrow IPC -----------
+def test_arrow_roundtrip():
+    pa = pytest.importorskip("pyarrow")
+    token = get_token()
+    table = pa.table({"numbers": pa.array([3, 1, 2], type=pa.int64())})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    response = client.post(
+        "/bubble-sort",
+        content=sink.getvalue().to_pybytes(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+        params={"token": token},
+    )
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.column("numbers").to_pylist() == [1, 2, 3]
+    assert result.schema.metadata[b"algorithm"] == b"timsort"
+
+
+# ----------- TEST: Columnas Arrow que no caben en int64 -----------
+def test_arrow_rejects_out_of_range_columns():
+    pa = pytest.importorskip("pyarrow")
+    token = get_token()
+
+    def post(array):
+        table = pa.table({"numbers": array})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return client.post(
+            "/sum-elements",
+            content=sink.getvalue().to_pybytes(),
+            headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+            params={"token": token},
+        )
+
+    response = post(pa.array([1, 2**63], type=pa.uint64()))
+    assert response.status_code == 400
+
+    response = post(pa.array([1.5, 2.5], type=pa.float64()))
+    assert response.status_code == 400
+
+    response = post(pa.array([1, 2**63 - 2], type=pa.uint64()))
+    assert response.status_code == 200
+    assert pa.ipc.open_stream(response.content).read_all().column(0).to_pylist() == [2**63 - 1]
+
+
+# ----------- TEST: JSON invalido sigue devolviendo 422 -----------
+def test_json_validation_error():
+    token = get_token()
+    response = client.post("/sum-elements", json={"numbers": ["a"]}, params={"token": token})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:2] == ["body", "numbers"]
+
+
+# ----------- HELPER: Cuerpo en bloques binarios con longitud -----------
+def int64_chunks(*chunks):
+    body = b""
+    for chunk in chunks:
+        data = np.array(chunk, dtype="<i8").tobytes()
+        body += struct.pack("<I", len(data)) + data
+    return body
+
+
+# ----------- TEST: Suma y maximo en streaming NDJSON -----------
+def test_stream_ndjson_aggregates():
+    token = get_token()
+    body = b"[1, 2, 3]\n4\n\n[-10, 25]\n7"
+    headers = {"Content-Type": "application/x-ndjson"}
+
+    response = client.post("/stream/sum-elements", content=body, headers=headers, params={"token": token})
+    assert response.status_code == 200
+    assert response.json()["sum"] == 32
+
+    response = client.post("/stream/max-value", content=body, headers=headers, params={"token": token})
+    assert response.status_code == 200
+    assert response.json()["max"] == 25
+
+
+# ----------- TEST: Filtro de pares en streaming binario -----------
+def test_stream_int64_chunks_filter_even():
+    token = get_token()
+    body = int64_chunks([1, 2, 3, 4], [5, 7], [8, -6])
+    response = client.post(
+        "/stream/filter-even",
+        content=iter([body[:5], body[5:30], body[30:]]),
+        headers={"Content-Type": "application/vnd.int64-chunks"},
+        params={"token": token},
+    )
+
+    assert response.status_code == 200
+    evens = []
+    content = response.content
+    while content:
+        (size,) = struct.unpack_from("<I", content)
+        evens.extend(np.frombuffer(content[4:4 + size], dtype="<i8").tolist())
+        content = content[4 + size:]
+    assert evens == [2, 4, 8, -6]
+
+
+# ----------- TEST: Streaming con lista vacia o formato no soportado -----------
+def test_stream_errors():
+    token = get_token()
+    response = client.post(
+        "/stream/max-value",
+        content=b"",
+        headers={"Content-Type": "application/x-ndjson"},
+        params={"token": token},
+    )
+    assert response.status_code == 400
+
+    response = client.post("/stream/filter-even", json=[1, 2], params={"token": token})
+    assert response.status_code == 415
+
+
+# ----------- TEST: Errores de validación en /stream/filter-even -----------
+def test_stream_filter_even_validation_errors():
+    token = get_token()
+    headers = {"Content-Type": "application/x-ndjson"}
+
+    # Un primer bloque inválido recibe un 400 antes de enviar las cabeceras
+    response = client.post(
+        "/stream/filter-even", content=b"no es json\n[2]\n", headers=headers, params={"token": token},
+    )
+    assert response.status_code == 400
+
+    # Un error posterior llega como último registro del stream
+    response = client.post(
+        "/stream/filter-even", content=b"[1, 2]\n[4]\nno es json\n[6]\n", headers=headers,
+        params={"token": token},
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [[2], [4], {"error": "Línea NDJSON inválida", "status": 400}]
+
+    body = int64_chunks([2, 3]) + struct.pack("<I", 16) + b"\x00" * 8
+    response = client.post(
+        "/stream/filter-even", content=body, headers={"Content-Type": "application/vnd.int64-chunks"},
+        params={"token": token},
+    )
+    assert response.status_code == 200
+    content = response.content
+    assert np.frombuffer(content[4:12], dtype="<i8").tolist() == [2]
+    marker, size = struct.unpack_from("<II", content, 12)
+    assert marker == 0xFFFFFFFF
+    assert json.loads(content[20:20 + size]) == {"error": "Bloque binario incompleto", "status": 400}
+
+
+# ----------- TEST: Camino NumPy da los mismos resultados que Python -----------
+@pytest.mark.parametrize("numbers", [
+    [],
+    [7],
+    [3, -4, 8, -1, 0, 2**62, -(2**62)],
+    [2**63 - 1, 2**63 - 1, 1],
+    [2**70, -3, 4],
+])
+def test_numpy_path_matches_python(monkeypatch, numbers):
+    expected = (filter_even(numbers), sum_elements(numbers), find_max(numbers) if numbers else None)
+    monkeypatch.setattr(utils, "NUMPY_THRESHOLD", 1)
+    result = (filter_even(numbers), sum_elements(numbers), find_max(numbers) if numbers else None)
+
+    assert result == expected
+    assert all(type(x) is int for x in result[0])
+    assert type(result[1]) is int
+
+
+# ----------- TEST: Endpoint de metricas -----------
+def test_metrics_endpoint():
+    token = get_token()
+    client.post("/sum-elements", json={"numbers": [1, 2, 3]}, params={"token": token})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/sum-elements",status="200"}' in text
+    assert 'http_request_size_bytes_bucket{method="POST",route="/sum-elements",le="64"}' in text
+    for phase_name in ("parse", "auth", "compute", "serialize"):
+        assert f'http_request_phase_seconds_count{{route="/sum-elements",phase="{phase_name}"}}' in text
+    assert "auth_token_cache_hits_total" in text
+
+
+# ----------- TEST: Cache de resultados con ETag -----------
+def test_result_cache_etag(monkeypatch):
+    monkeypatch.setattr(result_cache, "enabled", True)
+    result_cache.clear()
+    token = get_token()
+    payload = {"numbers": [4, 1, 3]}
+
+    first = client.post("/bubble-sort", json=payload, params={"token": token})
+    assert first.status_code == 200
+    assert first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+
+    second = client.post("/bubble-sort", json=payload, params={"token": token})
+    assert second.headers["x-cache"] == "HIT"
+    assert second.headers["etag"] == etag
+    assert second.json() == first.json()
+
+    # Otro algoritmo es otro resultado
+    other = client.post("/bubble-sort", json=payload, params={"token": token, "algorithm": "numpy"})
+    assert other.headers["etag"] != etag
+
+    not_modified = client.post(
+        "/bubble-sort", json=payload, params={"token": token}, headers={"If-None-Match": etag}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+# ----------- TEST: Un acierto de la cache no se presenta como calculo nuevo -----------
+def test_result_cache_hit_marks_replayed_timing(monkeypatch):
+    monkeypatch.setattr(result_cache, "enabled", True)
+    result_cache.clear()
+    token = get_token()
+    body = np.array([3, 1, 2], dtype="<i8").tobytes()
+    headers = {"Content-Type": "application/octet-stream"}
+
+    first = client.post("/bubble-sort", content=body, headers=headers, params={"token": token})
+    assert "x-elapsed-ms" in first.headers
+    assert "age" not in first.headers
+
+    second = client.post("/bubble-sort", content=body, headers=headers, params={"token": token})
+    assert second.headers["x-cache"] == "HIT"
+    assert "x-elapsed-ms" not in second.headers
+    assert int(second.headers["age"]) >= 0
+    assert second.content == first.content
+
+
+# ----------- TEST: El token se verifica una sola vez con la cache activa -----------
+def test_result_cache_verifies_token_once(monkeypatch):
+    monkeypatch.setattr(result_cache, "enabled", True)
+    result_cache.clear()
+    token = get_token()
+    calls = []
+
+    def counting_verify(value):
+        calls.append(value)
+        return verify_token(value)
+
+    monkeypatch.setattr("app.result_cache.verify_token", counting_verify)
+    monkeypatch.setattr("app.algorithms.verify_token", counting_verify)
+    response = client.post("/sum-elements", json={"numbers": [1, 2]}, params={"token": token})
+    assert response.headers["x-cache"] == "MISS"
+    assert calls == [token]
+
+
+# ----------- TEST: Cache de resultados no salta la autenticacion -----------
+def test_result_cache_requires_token(monkeypatch):
+    monkeypatch.setattr(result_cache, "enabled", True)
+    token = get_token()
+    payload = {"numbers": [9, 8]}
+    etag = client.post("/sum-elements", json=payload, params={"token": token}).headers["etag"]
+
+    response = client.post(
+        "/sum-elements", json=payload, params={"token": "invalido"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 401
+
+
+# ----------- TEST: Top-k -----------
+def test_top_k():
+    token = get_token()
+    payload = {"numbers": [5, 1, 9, 3, 7, 9]}
+    response = client.post("/top-k", json=payload, params={"token": token, "k": 3})
+
+    assert response.status_code == 200
+    assert response.json()["top_k"] == [9, 9, 7]
+
+
+# ----------- TEST: k-esimo elemento y percentil -----------
+def test_kth_element_and_percentile():
+    token = get_token()
+    payload = {"numbers": [50, 15, 40, 20, 35]}
+
+    response = client.post("/kth-element", json=payload, params={"token": token, "k": 2})
+    assert response.status_code == 200
+    assert response.json()["value"] == 20
+
+    response = client.post("/percentile", json=payload, params={"token": token, "p": 50})
+    assert response.status_code == 200
+    assert response.json()["value"] == 35
+
+    response = client.post("/kth-element", json=payload, params={"token": token, "k": 6})
+    assert response.status_code == 400
+
+
+# ----------- TEST: Percentil por rango más cercano sin error de redondeo -----------
+@pytest.mark.parametrize("p, expected", [
+    (0, 1), (1, 1), (7, 7), (14, 14), (28, 28), (50, 50), (55, 55), (56, 56), (57, 57),
+    (99, 99), (100, 100), (12.5, 13), (0.5, 1),
+])
+def test_percentile_nearest_rank(p, expected):
+    assert percentile(list(range(1, 101)), p) == expected
+
+
+# ----------- TEST: Mezcla de listas ordenadas -----------
+def test_merge_sorted():
+    token = get_token()
+    payload = {"arrays": [[1, 4, 9], [2, 3], [], [0, 10]]}
+    response = client.post("/merge-sorted", json=payload, params={"token": token})
+
+    assert response.status_code == 200
+    assert response.json()["numbers"] == [0, 1, 2, 3, 4, 9, 10]
+
+    response = client.post("/merge-sorted", json={"arrays": [[3, 1]]}, params={"token": token})
+    assert response.status_code == 400
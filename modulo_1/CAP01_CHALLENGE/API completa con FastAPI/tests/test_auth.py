@@ -1,7 +1,12 @@
 # tests/test_auth.py
 
+import sqlite3
+
 from fastapi.testclient import TestClient
 from app.main import app
+from app import auth
+from app.auth import PasswordHasher, remove_user
+from app.user_store import SQLiteUserStore
 
 cliente = TestClient(app)
 
@@ -45,3 +50,66 @@ def test_obtener_token_y_usarlo():
     respuesta = cliente.post("/bubble-sort", json=payload, params={"token": token})
     assert respuesta.status_code == 200
     assert respuesta.json()["numbers"] == [1, 2, 3]
+
+# ----------- TEST: Cache de tokens verificados -----------
+def test_cache_de_tokens():
+    usuario = {"username": "usuario_cache", "password": "clave_cache"}
+    cliente.post("/register", json=usuario)
+    token = cliente.post("/login", json=usuario).json()["access_token"]
+
+    antes = cliente.get("/token-cache/stats").json()
+    for _ in range(3):
+        respuesta = cliente.post("/sum-elements", json={"numbers": [1, 2]}, params={"token": token})
+        assert respuesta.status_code == 200
+    despues = cliente.get("/token-cache/stats").json()
+
+    assert despues["misses"] - antes["misses"] == 1
+    assert despues["hits"] - antes["hits"] == 2
+
+# ----------- TEST: Eliminar usuario invalida sus tokens -----------
+def test_eliminar_usuario_invalida_token():
+    usuario = {"username": "usuario_eliminado", "password": "clave_eliminada"}
+    cliente.post("/register", json=usuario)
+    token = cliente.post("/login", json=usuario).json()["access_token"]
+    assert cliente.post("/sum-elements", json={"numbers": [1]}, params={"token": token}).status_code == 200
+
+    remove_user(usuario["username"])
+
+    respuesta = cliente.post("/sum-elements", json={"numbers": [1]}, params={"token": token})
+    assert respuesta.status_code == 401
+    assert respuesta.json()["detail"] == "Usuario inválido"
+
+# ----------- TEST: Pool de contraseñas saturado devuelve 503 -----------
+def test_pool_de_contrasenas_saturado(monkeypatch):
+    saturado = PasswordHasher(workers=1, queue_depth=0)
+    saturado.pending = 1
+    monkeypatch.setattr(auth, "password_hasher", saturado)
+
+    respuesta = cliente.post("/login", json=usuario_prueba)
+    assert respuesta.status_code == 503
+    assert respuesta.headers["retry-after"] == "1"
+
+    respuesta = cliente.post("/register", json={"username": "otro", "password": "x"})
+    assert respuesta.status_code == 503
+
+# ----------- TEST: Almacén de usuarios SQLite compartido -----------
+def test_almacen_sqlite(tmp_path):
+    ruta = str(tmp_path / "usuarios.db")
+    almacen = SQLiteUserStore(path=ruta, cache_ttl=60)
+    usuario = {"username": "ana", "hashed_password": "hash"}
+
+    assert almacen.add(usuario)
+    assert not almacen.add(usuario)
+    assert almacen.get("ana") == usuario
+    assert "nadie" not in almacen
+
+    # Otro worker con su propia conexión ve el mismo usuario
+    otro_worker = SQLiteUserStore(path=ruta)
+    assert "ana" in otro_worker
+
+    assert almacen.remove("ana")
+    assert almacen.get("ana") is None
+    assert not almacen.remove("ana")
+
+    modo = sqlite3.connect(ruta).execute("PRAGMA journal_mode").fetchone()[0]
+    assert modo == "wal"
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+from typing import List, Optional, Tuple
+
+# Registro de cambios de las tareas para sincronizar clientes por incrementos.
+#
+# Cada modificación de FakeDB recibe un número de secuencia y se guarda en un
+# búfer circular acotado. Un cliente pide los cambios posteriores a la última
+# secuencia que vio; si esa secuencia ya salió del búfer (o es de antes de un
+# reinicio) tiene que volver a descargar la lista completa.
+#
+# Las secuencias vuelven a empezar en cada arranque, así que el cliente no
+# recibe la secuencia sola sino un cursor ``<época>-<seq>``, donde la época
+# identifica al arranque. Un cursor de otra época obliga a resincronizar.
+
+CHANGES_BUFFER_SIZE = int(os.getenv("TASKS_CHANGES_BUFFER", "10000"))
+
+Change = Tuple[int, dict]
+
+
+def resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def change_from_record(record: list) -> dict:
+    """Convierte un registro del diario de FakeDB en un cambio para los clientes."""
+    if record[0] == "d":
+        return {"op": "delete", "id": record[1]}
+    _, task_id, title, description, completed, version = record
+    return {
+        "op": "put",
+        "task": {"id": task_id, "title": title, "description": description, "completed": completed, "version": version},
+    }
+
+
+class ChangeFeed:
+    def __init__(self, size: int = CHANGES_BUFFER_SIZE):
+        self.buffer: "deque[Change]" = deque(maxlen=size)
+        self.seq = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self.lock = threading.Lock()
+        self.waiters: List[asyncio.Future] = []
+
+    def publish(self, changes: List[dict]):
+        """Añade cambios (desde cualquier hilo) y despierta a quien los espera."""
+        with self.lock:
+            for change in changes:
+                self.seq += 1
+                self.buffer.append((self.seq, change))
+            waiters, self.waiters = self.waiters, []
+        for future in waiters:
+            future.get_loop().call_soon_threadsafe(resolve, future)
+
+    def cursor(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def position(self, cursor: str) -> Optional[int]:
+        """Secuencia de un cursor de este arranque; None si es de otro (o no es válido).
+
+        ``"0"`` (o vacío) es el cursor inicial y vale en cualquier arranque.
+        """
+        if cursor in ("", "0"):
+            return 0
+        epoch, _, seq = cursor.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def since(self, seq: int, limit: int) -> Optional[List[Change]]:
+        """Hasta ``limit`` cambios posteriores a ``seq``; None si el cliente debe resincronizar."""
+        with self.lock:
+            if seq > self.seq:
+                return None
+            oldest = self.buffer[0][0] if self.buffer else self.seq + 1
+            if seq < oldest - 1:
+                return None
+            start = seq - oldest + 1
+            return list(islice(self.buffer, start, start + limit))
+
+    async def wait(self, seq: int, timeout: float):
+        """Espera hasta ``timeout`` segundos a que haya cambios posteriores a ``seq``."""
+        with self.lock:
+            if self.seq > seq:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self.waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self.lock:
+                if future in self.waiters:
+                    self.waiters.remove(future)
+
+
+change_feed = ChangeFeed()
@@ -1,36 +1,355 @@
-from models import Task
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from changes import change_from_record
+from models import BulkOperation, Task
+
+# Candados por franja de ids: dos modificaciones solo se esperan entre sí si
+# sus tareas caen en la misma franja
+LOCK_STRIPES = 64
+
+# Longitud máxima de los prefijos de título indexados. Un prefijo más largo se
+# busca en el índice de sus primeros caracteres y se filtra al recorrerlo.
+PREFIX_INDEX_LENGTH = 3
+
+ALL = ("id",)
+
+
+def status_key(completed: bool) -> Tuple:
+    return ("completed", completed)
+
+
+def prefix_keys(title: str) -> List[Tuple]:
+    folded = title.casefold()
+    return [("title", folded[:length]) for length in range(1, min(len(folded), PREFIX_INDEX_LENGTH) + 1)]
+
+
+class VersionConflict(Exception):
+    """La versión esperada (If-Match) no coincide con la actual de la tarea."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Versión actual: {current_version}")
+        self.current_version = current_version
 
 
 class FakeDB:
     def __init__(self):
-        self.tasks = []
+        # id -> tarea; el dict conserva el orden de inserción
+        self.tasks: Dict[int, Task] = {}
+        # Índices secundarios: clave -> lista ordenada de ids. Como los ids son
+        # monotónicos, una tarea nueva siempre se añade al final (O(1)). Las
+        # entradas que dejan de cumplir la clave no se borran en el momento: se
+        # saltan al recorrer y se compactan cuando son más de la mitad.
+        self.indexes: Dict[Hashable, List[int]] = {}
+        self.stale: Dict[Hashable, int] = {}
+        # Contador monotónico: los ids nunca se reutilizan tras un borrado
+        self.next_id = 1
+        # Diario de persistencia (persistence.TaskJournal); None = solo en memoria
+        self.journal = None
+        # Registro de cambios para los clientes (changes.ChangeFeed); None = sin publicar
+        self.feed = None
+        # Registros de un lote en curso: se escriben juntos en una sola línea
+        self.batch: Optional[List[list]] = None
+        # Las tareas guardadas no se modifican nunca (copy-on-write): un cambio
+        # crea una copia con la versión siguiente y la sustituye en el dict, así
+        # que un lector siempre ve una tarea entera.
+        #
+        # Cada tarea se protege con el candado de su franja, así que cambios en
+        # ids distintos avanzan en paralelo. Los candados compartidos se toman
+        # solo durante la parte corta de cada operación, y siempre en este
+        # orden: franja, id_lock (reserva de ids), index_lock (altas y bajas
+        # del dict y listas de los índices). Con index_lock no se escribe en el
+        # diario.
+        self.stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self.id_lock = threading.RLock()
+        self.index_lock = threading.RLock()
+
+    def stripe(self, task_id: int) -> threading.RLock:
+        return self.stripes[task_id % LOCK_STRIPES]
+
+    def keys_for(self, task: Task) -> List[Tuple]:
+        return [ALL, status_key(task.completed)] + prefix_keys(task.title)
+
+    def matches(self, task: Optional[Task], key: Tuple) -> bool:
+        if task is None:
+            return False
+        if key[0] == "completed":
+            return task.completed == key[1]
+        if key[0] == "title":
+            return task.title.casefold().startswith(key[1])
+        return True
+
+    def index_add(self, key: Tuple, task_id: int):
+        ids = self.indexes.setdefault(key, [])
+        if not ids or ids[-1] < task_id:
+            ids.append(task_id)
+            return
+        position = bisect_left(ids, task_id)
+        if position < len(ids) and ids[position] == task_id:
+            # La entrada vieja vuelve a ser válida
+            self.stale[key] -= 1
+        else:
+            ids.insert(position, task_id)
+
+    def index_discard(self, key: Tuple):
+        self.stale[key] = self.stale.get(key, 0) + 1
+        ids = self.indexes[key]
+        if self.stale[key] * 2 > len(ids):
+            self.indexes[key] = [task_id for task_id in ids if self.matches(self.tasks.get(task_id), key)]
+            self.stale[key] = 0
+
+    def scan(self, key: Tuple, after: int = 0) -> Iterator[Task]:
+        """Recorre en orden de id las tareas de un índice con id mayor que ``after``."""
+        ids = self.indexes.get(key, [])
+        for position in range(bisect_right(ids, after), len(ids)):
+            task = self.tasks.get(ids[position])
+            if self.matches(task, key):
+                yield task
+
+    def log(self, record: list):
+        if self.batch is not None:
+            self.batch.append(record)
+            return
+        if self.journal is not None:
+            self.journal.append(record)
+        if self.feed is not None:
+            # Un lote se publica entero de una vez, como se escribe en el diario
+            records = record[1] if record[0] == "b" else [record]
+            self.feed.publish([change_from_record(item) for item in records])
+
+    def log_put(self, task: Task):
+        self.log(["p", task.id, task.title, task.description, task.completed, task.version])
 
     def add_task(self, task: Task):
-        task.id = len(self.tasks) + 1
-        self.tasks.append(task)
+        # El id se reserva y se indexa sin soltar id_lock: así los ids se hacen
+        # visibles en orden y un cursor nunca salta uno menor que llega tarde.
+        # Nadie puede modificar todavía la tarea, así que no hace falta su franja.
+        with self.id_lock:
+            task_id = self.next_id
+            self.next_id += 1
+            task = task.model_copy(update={"id": task_id, "version": 1})
+            with self.index_lock:
+                self.tasks[task_id] = task
+                for key in self.keys_for(task):
+                    self.index_add(key, task_id)
+            self.log_put(task)
         return task
 
+    def put_task(self, task: Task):
+        """Guarda una tarea con su id tal cual (recuperación desde disco)."""
+        with self.index_lock:
+            old = self.tasks.get(task.id)
+            old_keys = self.keys_for(old) if old is not None else []
+            self.tasks[task.id] = task
+            self.reindex(task.id, old_keys, self.keys_for(task))
+            self.next_id = max(self.next_id, task.id + 1)
+
+    def clear(self):
+        """Vacía el store (antes de recuperarlo desde disco)."""
+        with self.id_lock, self.index_lock:
+            self.tasks = {}
+            self.indexes = {}
+            self.stale = {}
+            self.next_id = 1
+
+    def load(self, rows: Iterable[list]):
+        """Carga en bloque tareas nuevas en orden de id (instantánea en un store vacío)."""
+        if self.tasks:
+            raise RuntimeError("load solo se puede usar con el store vacío")
+        tasks = self.tasks
+        indexes = self.indexes
+        for task_id, title, description, completed, *version in rows:
+            task = Task(id=task_id, title=title, description=description, completed=completed,
+                        version=version[0] if version else 1)
+            tasks[task_id] = task
+            for key in self.keys_for(task):
+                ids = indexes.get(key)
+                if ids is None:
+                    ids = indexes[key] = []
+                ids.append(task_id)
+            self.next_id = task_id + 1
+
+    def replay(self, record: list):
+        """Aplica un registro del diario escrito por ``log``."""
+        if record[0] == "p":
+            # Los registros anteriores al versionado no llevan versión
+            _, task_id, title, description, completed, *version = record
+            self.put_task(Task(id=task_id, title=title, description=description, completed=completed,
+                               version=version[0] if version else 1))
+        elif record[0] == "d":
+            self.delete_task(record[1])
+        else:
+            for item in record[1]:
+                self.replay(item)
+
+    async def sync(self):
+        """Espera a que las modificaciones hechas hasta ahora estén en disco."""
+        if self.journal is not None:
+            await self.journal.wait_durable()
+
     def get_task(self, task_id: int):
-        task = next((task for task in self.tasks if task.id == task_id), None)
-        return task
+        return self.tasks.get(task_id)
+
+    def get_tasks(self, completed: Optional[bool] = None) -> List[Task]:
+        if completed is None:
+            return list(self.tasks.values())
+        with self.index_lock:
+            return list(self.scan(status_key(completed)))
+
+    def get_page(self, limit: int, after: int = 0, completed: Optional[bool] = None,
+                 title_prefix: Optional[str] = None) -> Tuple[List[Task], Optional[int]]:
+        """Página de tareas con id mayor que ``after`` (paginación por cursor).
+
+        Se recorre el índice más corto de los que aplican y se filtra por el
+        resto de condiciones, así que el coste depende del tamaño de la página y
+        no del total de tareas. Devuelve la página y el cursor de la siguiente,
+        o ``None`` si no hay más.
+        """
+        prefix = title_prefix.casefold() if title_prefix else None
+        keys = []
+        if prefix:
+            keys.append(("title", prefix[:PREFIX_INDEX_LENGTH]))
+        if completed is not None:
+            keys.append(status_key(completed))
+        # Un prefijo común con un estado raro (o al revés) se recorre por el raro
+        key = min(keys, key=lambda key: len(self.indexes.get(key, ())), default=ALL)
+        source = self.scan(key, after)
+
+        page: List[Task] = []
+        # Las listas de los índices no se pueden recorrer mientras otro hilo las cambia
+        with self.index_lock:
+            for task in source:
+                if completed is not None and task.completed != completed:
+                    continue
+                if prefix is not None and not task.title.casefold().startswith(prefix):
+                    continue
+                if len(page) == limit:
+                    return page, page[-1].id
+                page.append(task)
+        return page, None
+
+    def update_task(self, task_id: int, task_update, expected_version: Optional[int] = None):
+        """Sustituye la tarea por una copia con los cambios y la versión siguiente.
+
+        Con ``expected_version`` solo se actualiza si la tarea sigue en esa
+        versión; si no, lanza VersionConflict.
+        """
+        with self.stripe(task_id):
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None
+            if expected_version is not None and task.version != expected_version:
+                raise VersionConflict(task.version)
+            changes = {"version": task.version + 1}
+            if task_update.title is not None:
+                changes["title"] = task_update.title
+            if task_update.description is not None:
+                changes["description"] = task_update.description
+            if task_update.completed is not None:
+                changes["completed"] = task_update.completed
+            updated = task.model_copy(update=changes)
+            old_keys, new_keys = self.keys_for(task), self.keys_for(updated)
+            if old_keys != new_keys:
+                # La compactación de un índice mira el dict: la tarea y sus
+                # entradas tienen que cambiar a la vez
+                with self.index_lock:
+                    self.tasks[task_id] = updated
+                    self.reindex(task_id, old_keys, new_keys)
+            else:
+                self.tasks[task_id] = updated
+            self.log_put(updated)
+            return updated
+
+    def reindex(self, task_id: int, old_keys: List[Tuple], new_keys: List[Tuple]):
+        for key in old_keys:
+            if key not in new_keys:
+                self.index_discard(key)
+        for key in new_keys:
+            if key not in old_keys:
+                self.index_add(key, task_id)
+
+    def delete_task(self, task_id: int, expected_version: Optional[int] = None):
+        with self.stripe(task_id):
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None
+            if expected_version is not None and task.version != expected_version:
+                raise VersionConflict(task.version)
+            with self.index_lock:
+                del self.tasks[task_id]
+                for key in self.keys_for(task):
+                    self.index_discard(key)
+            self.log(["d", task_id])
+            return task
+
+    def bulk(self, operations: List[BulkOperation]) -> Tuple[List[Task], List[dict]]:
+        """Comprueba y aplica un lote con todas las franjas bloqueadas.
+
+        Devuelve (tareas, errores por elemento); con errores no se aplica nada.
+        """
+        with ExitStack() as stack:
+            for lock in self.stripes:
+                stack.enter_context(lock)
+            # Los ids que reciben las altas del lote deben ser los previstos
+            stack.enter_context(self.id_lock)
+            errors = self.check_bulk(operations)
+            if errors:
+                return [], errors
+            return self.apply_bulk(operations), []
+
+    def check_bulk(self, operations: List[BulkOperation]) -> List[dict]:
+        """Comprueba un lote sin modificar nada y devuelve sus errores por elemento.
+
+        Se simula el lote en orden: un update o delete puede referirse a una
+        tarea creada antes en el mismo lote (sus ids son predecibles) y falla si
+        la tarea ya se borró en una operación anterior.
+        """
+        errors = []
+        deleted = set()
+        next_id = self.next_id
+        for index, operation in enumerate(operations):
+            if operation.op == "create":
+                if operation.task is None:
+                    errors.append({"index": index, "error": "create requiere 'task'"})
+                else:
+                    next_id += 1
+                continue
+            if operation.id is None:
+                errors.append({"index": index, "error": f"{operation.op} requiere 'id'"})
+            elif operation.op == "update" and operation.changes is None:
+                errors.append({"index": index, "error": "update requiere 'changes'"})
+            elif operation.id in deleted or not (
+                operation.id in self.tasks or self.next_id <= operation.id < next_id
+            ):
+                errors.append({"index": index, "error": "Tarea no encontrada"})
+            elif operation.op == "delete":
+                deleted.add(operation.id)
+        return errors
+
+    def apply_bulk(self, operations: List[BulkOperation]) -> List[Task]:
+        """Aplica un lote ya comprobado con ``check_bulk``, en una sola pasada.
 
-    def get_tasks(self):
-        return self.tasks
-
-    def update_task(self, task_id: int, task_update):
-        for task in self.tasks:
-            if task.id == task_id:
-                if task_update.title is not None:
-                    task.title = task_update.title
-                if task_update.description is not None:
-                    task.description = task_update.description
-                if task_update.completed is not None:
-                    task.completed = task_update.completed
-                return task
-        return None
-
-    def delete_task(self, task_id: int):
-        self.tasks = [task for task in self.tasks if task.id != task_id]
+        Devuelve, por operación, la tarea creada, actualizada o borrada. En el
+        diario el lote ocupa un solo registro, así que tras una caída se
+        recupera entero o no se recupera.
+        """
+        results = []
+        self.batch = []
+        try:
+            for operation in operations:
+                if operation.op == "create":
+                    results.append(self.add_task(operation.task))
+                elif operation.op == "update":
+                    results.append(self.update_task(operation.id, operation.changes))
+                else:
+                    results.append(self.delete_task(operation.id))
+        finally:
+            records, self.batch = self.batch, None
+            if records:
+                self.log(["b", records])
+        return results
 
 
 db = FakeDB()
@@ -1,7 +1,20 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from repository import repository
 from routers.tasks_router import tasks_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # TASKS_BACKEND elige el repositorio; en memoria, con TASKS_DATA_DIR las
+    # tareas se recuperan del disco y cada cambio se persiste
+    await repository.open()
+    yield
+    await repository.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(tasks_router, prefix="/tasks", tags=["tasks"])
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 
 class Task(BaseModel):
@@ -7,6 +7,8 @@ class Task(BaseModel):
     title: str
     description: Optional[str] = None
     completed: bool = False
+    # Versión de la tarea: la asigna el servidor y sube en cada cambio
+    version: int = 1
 
 
 class UpdateTaskModel(BaseModel):
@@ -17,3 +19,15 @@ class UpdateTaskModel(BaseModel):
 
 class TaskList(BaseModel):
     tasks: List[Task]
+    # Cursor para pedir la página siguiente; None si no hay más tareas
+    next_cursor: Optional[int] = None
+
+
+class BulkOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    # Id de la tarea para update y delete
+    id: Optional[int] = None
+    # Tarea a crear (create)
+    task: Optional[Task] = None
+    # Cambios a aplicar (update)
+    changes: Optional[UpdateTaskModel] = None
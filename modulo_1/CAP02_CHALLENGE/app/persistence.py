@@ -0,0 +1,261 @@
+import asyncio
+import json
+import os
+import threading
+from typing import List, Optional, Tuple
+
+# Persistencia de FakeDB: diario de solo escritura al final + instantáneas.
+#
+# Cada modificación se añade al diario como una línea JSON. Un hilo escritor
+# vacía el búfer, escribe todas las líneas pendientes y hace un solo fsync por
+# tanda (group commit): mientras un fsync está en curso, las modificaciones
+# nuevas se acumulan y van juntas en el siguiente.
+#
+# El diario se divide en segmentos numerados (tasks.log.<generación>). Cada
+# TASKS_SNAPSHOT_EVERY registros se abre un segmento nuevo y, en segundo plano,
+# se escribe una instantánea con todas las tareas hasta ese punto; después se
+# borran los segmentos anteriores. Al arrancar se carga la instantánea y se
+# reproducen los segmentos posteriores.
+
+TASKS_DATA_DIR = os.getenv("TASKS_DATA_DIR")
+SNAPSHOT_EVERY = int(os.getenv("TASKS_SNAPSHOT_EVERY", "100000"))
+# Espera opcional antes de cada fsync para juntar más registros en la tanda
+COMMIT_DELAY = float(os.getenv("TASKS_COMMIT_DELAY_MS", "0")) / 1000
+
+LOG_PREFIX = "tasks.log."
+SNAPSHOT_FILE = "tasks.snapshot"
+SNAPSHOT_CHUNK = 10000
+
+
+class Rotate:
+    """Marca en el búfer: a partir de aquí se escribe en un segmento nuevo."""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+
+
+def resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def fsync_directory(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class TaskJournal:
+    def __init__(self, directory: str, snapshot_every: int = SNAPSHOT_EVERY, commit_delay: float = COMMIT_DELAY):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.commit_delay = commit_delay
+        self.db = None
+        self.generation = 0
+        self.file = None
+        self.pending: list = []
+        self.appended_seq = 0
+        self.durable_seq = 0
+        self.waiters: List[Tuple[int, asyncio.Future]] = []
+        self.cond = threading.Condition()
+        self.closed = False
+        self.writer: Optional[threading.Thread] = None
+        self.since_snapshot = 0
+        self.snapshot_thread: Optional[threading.Thread] = None
+        self.snapshotting = False
+
+    def segment_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"{LOG_PREFIX}{generation:08d}")
+
+    def segments(self) -> List[int]:
+        return sorted(
+            int(name[len(LOG_PREFIX):]) for name in os.listdir(self.directory)
+            if name.startswith(LOG_PREFIX) and name[len(LOG_PREFIX):].isdigit()
+        )
+
+    # ----------- Recuperación -----------
+
+    def recover(self, db) -> int:
+        """Carga la instantánea y el diario en ``db`` y empieza a registrar sus cambios.
+
+        El estado de ``db`` se sustituye por el del disco, así que recuperar de
+        nuevo el mismo store (por ejemplo al volver a arrancar la aplicación en
+        el mismo proceso) no duplica nada. Devuelve el número de registros del
+        diario reproducidos.
+        """
+        if db.journal is not None:
+            raise RuntimeError("El store ya tiene un diario abierto")
+        os.makedirs(self.directory, exist_ok=True)
+        db.clear()
+        generation = 0
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                generation = header["generation"]
+                db.load(json.loads(line) for line in f)
+                db.next_id = max(db.next_id, header["next_id"])
+
+        replayed = 0
+        segments = self.segments()
+        for segment in segments:
+            if segment < generation:
+                # Ya incluido en la instantánea
+                os.remove(self.segment_path(segment))
+                continue
+            with open(self.segment_path(segment), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Línea a medio escribir por una caída: no llegó a confirmarse
+                        break
+                    db.replay(record)
+                    replayed += 1
+
+        # Cada arranque escribe en un segmento nuevo, sin tocar los anteriores
+        self.generation = max([generation, *segments]) + 1
+        self.file = open(self.segment_path(self.generation), "a", encoding="utf-8")
+        self.since_snapshot = replayed
+        self.db = db
+        db.journal = self
+        self.writer = threading.Thread(target=self.write_loop, name="task-journal", daemon=True)
+        self.writer.start()
+        return replayed
+
+    # ----------- Escritura -----------
+
+    def append(self, record: list):
+        line = json.dumps(record, separators=(",", ":"))
+        with self.cond:
+            self.pending.append(line)
+            self.appended_seq += 1
+            self.cond.notify()
+            self.since_snapshot += 1
+            snapshot = self.since_snapshot >= self.snapshot_every and not self.snapshotting
+            if snapshot:
+                self.since_snapshot = 0
+                self.snapshotting = True
+        if snapshot:
+            self.start_snapshot()
+
+    async def wait_durable(self):
+        """Espera al fsync de todo lo añadido hasta ahora."""
+        with self.cond:
+            seq = self.appended_seq
+            if self.durable_seq >= seq:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self.waiters.append((seq, future))
+        await future
+
+    def write_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if self.commit_delay and not self.closed:
+                    self.cond.wait(self.commit_delay)
+                batch, self.pending = self.pending, []
+                seq = self.appended_seq
+                closed = self.closed
+
+            lines = []
+            for item in batch:
+                if isinstance(item, Rotate):
+                    self.flush(lines)
+                    lines = []
+                    self.file.close()
+                    self.file = open(self.segment_path(item.generation), "a", encoding="utf-8")
+                else:
+                    lines.append(item)
+            self.flush(lines)
+
+            with self.cond:
+                self.durable_seq = seq
+                ready = [future for waiter_seq, future in self.waiters if waiter_seq <= seq]
+                self.waiters = [(waiter_seq, future) for waiter_seq, future in self.waiters if waiter_seq > seq]
+            for future in ready:
+                future.get_loop().call_soon_threadsafe(resolve, future)
+            if closed:
+                return
+
+    def flush(self, lines: List[str]):
+        if lines:
+            self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    # ----------- Instantáneas -----------
+
+    def capture(self) -> Tuple[list, int]:
+        # Se toma con el búfer bloqueado: cualquier cambio ya registrado está en
+        # la copia, y uno aplicado pero aún sin registrar irá al segmento nuevo
+        # (reaplicarlo es inofensivo). Las tareas no se modifican nunca, así que
+        # basta con copiar la lista de referencias.
+        with self.cond:
+            tasks = list(self.db.tasks.values())
+            next_id = self.db.next_id
+        return tasks, next_id
+
+    def start_snapshot(self):
+        """Abre un segmento nuevo y escribe en segundo plano la instantánea del estado actual."""
+        with self.cond:
+            tasks, next_id = self.capture()
+            self.generation += 1
+            self.pending.append(Rotate(self.generation))
+            self.cond.notify()
+        self.snapshot_thread = threading.Thread(
+            target=self.write_snapshot, args=(tasks, next_id, self.generation), name="task-snapshot", daemon=True,
+        )
+        self.snapshot_thread.start()
+
+    def write_snapshot(self, tasks: list, next_id: int, generation: int):
+        try:
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"generation": generation, "next_id": next_id}) + "\n")
+                for start in range(0, len(tasks), SNAPSHOT_CHUNK):
+                    chunk = tasks[start:start + SNAPSHOT_CHUNK]
+                    f.write("\n".join(
+                        json.dumps([task.id, task.title, task.description, task.completed, task.version],
+                                   separators=(",", ":"))
+                        for task in chunk
+                    ) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            fsync_directory(self.directory)
+            for segment in self.segments():
+                if segment < generation:
+                    os.remove(self.segment_path(segment))
+        finally:
+            # Si falla, los segmentos siguen ahí y la siguiente instantánea lo reintenta
+            self.snapshotting = False
+
+    def close(self, snapshot: bool = True):
+        """Vacía el diario y, si ``snapshot``, deja una instantánea para arrancar rápido."""
+        snapshot_thread = self.snapshot_thread
+        if snapshot_thread is not None:
+            snapshot_thread.join()
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.writer.join()
+        self.file.close()
+        self.db.journal = None
+        if snapshot:
+            tasks, next_id = self.capture()
+            self.write_snapshot(tasks, next_id, self.generation + 1)
+
+
+def open_journal(db, directory: Optional[str] = TASKS_DATA_DIR) -> Optional[TaskJournal]:
+    """Recupera ``db`` desde ``directory`` y lo deja persistiendo; None si no hay directorio."""
+    if not directory:
+        return None
+    journal = TaskJournal(directory)
+    journal.recover(db)
+    return journal
@@ -0,0 +1,349 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from changes import ChangeFeed, change_feed
+from db import FakeDB, VersionConflict, db
+from models import BulkOperation, Task, UpdateTaskModel
+from persistence import open_journal
+
+# Repositorios de tareas intercambiables para el router:
+#   memory  FakeDB en el proceso (persistente en disco con TASKS_DATA_DIR)
+#   sqlite  SQLite en modo WAL, compartido entre varios workers de uvicorn
+
+TASKS_BACKEND = os.getenv("TASKS_BACKEND", "memory")
+TASKS_DB_PATH = os.getenv("TASKS_DB_PATH", "tasks.db")
+# Conexiones (y hilos) del pool de SQLite
+TASKS_DB_POOL_SIZE = int(os.getenv("TASKS_DB_POOL_SIZE", "4"))
+
+Page = Tuple[List[Task], Optional[int]]
+
+
+class TaskRepository(ABC):
+    # Registro de cambios del backend; None si no lo publica
+    feed: Optional[ChangeFeed] = None
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def add(self, task: Task) -> Task:
+        pass
+
+    @abstractmethod
+    async def get(self, task_id: int) -> Optional[Task]:
+        pass
+
+    @abstractmethod
+    async def page(self, limit: int, after: int = 0, completed: Optional[bool] = None,
+                   title_prefix: Optional[str] = None) -> Page:
+        """Tareas con id mayor que ``after`` y el cursor de la página siguiente."""
+
+    @abstractmethod
+    async def update(self, task_id: int, changes: UpdateTaskModel,
+                     expected_version: Optional[int] = None) -> Optional[Task]:
+        """Con ``expected_version`` lanza VersionConflict si la tarea ya cambió."""
+
+    @abstractmethod
+    async def delete(self, task_id: int, expected_version: Optional[int] = None) -> Optional[Task]:
+        """Con ``expected_version`` lanza VersionConflict si la tarea ya cambió."""
+
+    @abstractmethod
+    async def bulk(self, operations: List[BulkOperation]) -> Tuple[List[Task], List[dict]]:
+        """Aplica el lote entero o nada; devuelve (tareas, errores por elemento)."""
+
+
+class MemoryTaskRepository(TaskRepository):
+    def __init__(self, store: FakeDB = db, feed: ChangeFeed = change_feed):
+        self.store = store
+        self.feed = feed
+        self.journal = None
+
+    async def open(self):
+        self.journal = open_journal(self.store)
+        # Después de recuperar: lo reproducido del diario no son cambios nuevos
+        self.store.feed = self.feed
+
+    async def close(self):
+        self.store.feed = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    async def add(self, task: Task) -> Task:
+        task = self.store.add_task(task)
+        await self.store.sync()
+        return task
+
+    async def get(self, task_id: int) -> Optional[Task]:
+        return self.store.get_task(task_id)
+
+    async def page(self, limit: int, after: int = 0, completed: Optional[bool] = None,
+                   title_prefix: Optional[str] = None) -> Page:
+        return self.store.get_page(limit, after, completed, title_prefix)
+
+    async def update(self, task_id: int, changes: UpdateTaskModel,
+                     expected_version: Optional[int] = None) -> Optional[Task]:
+        task = self.store.update_task(task_id, changes, expected_version)
+        await self.store.sync()
+        return task
+
+    async def delete(self, task_id: int, expected_version: Optional[int] = None) -> Optional[Task]:
+        task = self.store.delete_task(task_id, expected_version)
+        await self.store.sync()
+        return task
+
+    async def bulk(self, operations: List[BulkOperation]) -> Tuple[List[Task], List[dict]]:
+        results, errors = self.store.bulk(operations)
+        if not errors:
+            await self.store.sync()
+        return results, errors
+
+
+class SQLiteTaskRepository(TaskRepository):
+    """Tareas en SQLite (modo WAL) con un pool de conexiones.
+
+    Cada conexión vive en un hilo del pool y las consultas se ejecutan allí,
+    sin bloquear el bucle de eventos. Las sentencias son constantes de clase
+    para que sqlite3 reutilice su versión preparada (cached_statements).
+
+    No publica registro de cambios: con varios workers cada proceso solo
+    vería sus propias modificaciones.
+
+    ``title_key`` guarda el título con ``casefold()``, como los índices de
+    FakeDB: LIKE de SQLite solo ignora mayúsculas en ASCII ("Ñandú" no
+    empezaría por "ñan"). El filtro por prefijo es un rango sobre esa columna.
+    """
+
+    TABLE = (
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+        "description TEXT, completed INTEGER NOT NULL DEFAULT 0, version INTEGER NOT NULL DEFAULT 1, "
+        "title_key TEXT NOT NULL DEFAULT '')"
+    )
+    INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed, id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_title_key ON tasks (title_key, id)",
+    )
+    COLUMNS = "id, title, description, completed, version"
+    INSERT_TASK = (
+        f"INSERT INTO tasks (title, description, completed, title_key) VALUES (?, ?, ?, ?) RETURNING {COLUMNS}"
+    )
+    GET_TASK = f"SELECT {COLUMNS} FROM tasks WHERE id = ?"
+    # Los dos últimos parámetros son la versión esperada (NULL = sin condición)
+    UPDATE_TASK = (
+        "UPDATE tasks SET title = COALESCE(?, title), description = COALESCE(?, description), "
+        "completed = COALESCE(?, completed), title_key = COALESCE(?, title_key), version = version + 1 "
+        f"WHERE id = ? AND (? IS NULL OR version = ?) RETURNING {COLUMNS}"
+    )
+    DELETE_TASK = f"DELETE FROM tasks WHERE id = ? AND (? IS NULL OR version = ?) RETURNING {COLUMNS}"
+    GET_VERSION = "SELECT version FROM tasks WHERE id = ?"
+    # Una consulta por combinación de filtros, para que cada una use su índice
+    PAGE_TASKS = {
+        (False, False): f"SELECT {COLUMNS} FROM tasks WHERE id > ? ORDER BY id LIMIT ?",
+        (True, False): f"SELECT {COLUMNS} FROM tasks WHERE completed = ? AND id > ? ORDER BY id LIMIT ?",
+        # Sin estadísticas (ANALYZE) SQLite prefiere recorrer por id, que con un
+        # prefijo poco frecuente lee toda la tabla
+        (False, True): (
+            f"SELECT {COLUMNS} FROM tasks INDEXED BY idx_tasks_title_key "
+            "WHERE title_key >= ? AND title_key < ? AND id > ? ORDER BY id LIMIT ?"
+        ),
+        (True, True): (
+            f"SELECT {COLUMNS} FROM tasks INDEXED BY idx_tasks_title_key "
+            "WHERE completed = ? AND title_key >= ? AND title_key < ? AND id > ? ORDER BY id LIMIT ?"
+        ),
+    }
+    # Mayor carácter Unicode: prefijo + MAX_CHAR acota por arriba el rango del prefijo
+    MAX_CHAR = "\U0010ffff"
+    BACKFILL_TITLE_KEYS = "SELECT id, title FROM tasks WHERE title_key = ''"
+    SET_TITLE_KEY = "UPDATE tasks SET title_key = ? WHERE id = ?"
+
+    def __init__(self, path: str = TASKS_DB_PATH, pool_size: int = TASKS_DB_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    async def open(self):
+        self.executor = ThreadPoolExecutor(self.pool_size, thread_name_prefix="tasks-sqlite")
+        await self.run(self._create_schema)
+
+    async def close(self):
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=True)
+        self.executor = None
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, cached_statements=64, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def _create_schema(self):
+        with self._connection() as connection:
+            connection.execute(self.TABLE)
+            # Bases creadas antes del versionado o de title_key
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(tasks)")}
+            if "version" not in columns:
+                connection.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            if "title_key" not in columns:
+                connection.execute("ALTER TABLE tasks ADD COLUMN title_key TEXT NOT NULL DEFAULT ''")
+                rows = connection.execute(self.BACKFILL_TITLE_KEYS).fetchall()
+                connection.executemany(self.SET_TITLE_KEY, [(title.casefold(), task_id) for task_id, title in rows])
+            for statement in self.INDEXES:
+                connection.execute(statement)
+
+    @staticmethod
+    def insert_params(task: Task) -> tuple:
+        return task.title, task.description, task.completed, task.title.casefold()
+
+    @staticmethod
+    def update_params(changes: UpdateTaskModel) -> tuple:
+        title_key = changes.title.casefold() if changes.title is not None else None
+        return changes.title, changes.description, changes.completed, title_key
+
+    @staticmethod
+    def to_task(row) -> Optional[Task]:
+        if row is None:
+            return None
+        return Task(id=row[0], title=row[1], description=row[2], completed=bool(row[3]), version=row[4])
+
+    def _conditional(self, connection: sqlite3.Connection, row, task_id: int) -> Optional[Task]:
+        """Resultado de un UPDATE/DELETE condicional: sin fila, no existe o cambió de versión."""
+        if row is not None:
+            return self.to_task(row)
+        current = connection.execute(self.GET_VERSION, (task_id,)).fetchone()
+        if current is not None:
+            raise VersionConflict(current[0])
+        return None
+
+    # ----------- Operaciones (se ejecutan en un hilo del pool) -----------
+
+    def _add(self, task: Task) -> Task:
+        with self._connection() as connection:
+            row = connection.execute(self.INSERT_TASK, self.insert_params(task)).fetchone()
+        return self.to_task(row)
+
+    def _get(self, task_id: int) -> Optional[Task]:
+        return self.to_task(self._connection().execute(self.GET_TASK, (task_id,)).fetchone())
+
+    def _page(self, limit: int, after: int, completed: Optional[bool], title_prefix: Optional[str]) -> Page:
+        params: list = []
+        if completed is not None:
+            params.append(completed)
+        if title_prefix:
+            prefix = title_prefix.casefold()
+            params += [prefix, prefix + self.MAX_CHAR]
+        # Se pide una fila de más para saber si hay página siguiente
+        params += [after, limit + 1]
+        query = self.PAGE_TASKS[(completed is not None, bool(title_prefix))]
+        tasks = [self.to_task(row) for row in self._connection().execute(query, params)]
+        if len(tasks) > limit:
+            return tasks[:limit], tasks[limit - 1].id
+        return tasks, None
+
+    def _update(self, task_id: int, changes: UpdateTaskModel, expected_version: Optional[int]) -> Optional[Task]:
+        with self._connection() as connection:
+            row = connection.execute(
+                self.UPDATE_TASK, (*self.update_params(changes), task_id, expected_version, expected_version),
+            ).fetchone()
+            return self._conditional(connection, row, task_id)
+
+    def _delete(self, task_id: int, expected_version: Optional[int]) -> Optional[Task]:
+        with self._connection() as connection:
+            row = connection.execute(self.DELETE_TASK, (task_id, expected_version, expected_version)).fetchone()
+            return self._conditional(connection, row, task_id)
+
+    def _bulk(self, operations: List[BulkOperation]) -> Tuple[List[Task], List[dict]]:
+        connection = self._connection()
+        results: List[Task] = []
+        errors: List[dict] = []
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for index, operation in enumerate(operations):
+                if operation.op == "create":
+                    if operation.task is None:
+                        errors.append({"index": index, "error": "create requiere 'task'"})
+                        continue
+                    task = operation.task
+                    cursor = connection.execute(self.INSERT_TASK, self.insert_params(task))
+                elif operation.id is None:
+                    errors.append({"index": index, "error": f"{operation.op} requiere 'id'"})
+                    continue
+                elif operation.op == "update":
+                    if operation.changes is None:
+                        errors.append({"index": index, "error": "update requiere 'changes'"})
+                        continue
+                    cursor = connection.execute(
+                        self.UPDATE_TASK, (*self.update_params(operation.changes), operation.id, None, None),
+                    )
+                else:
+                    cursor = connection.execute(self.DELETE_TASK, (operation.id, None, None))
+                task = self.to_task(cursor.fetchone())
+                if task is None:
+                    errors.append({"index": index, "error": "Tarea no encontrada"})
+                else:
+                    results.append(task)
+        except BaseException:
+            connection.rollback()
+            raise
+        if errors:
+            connection.rollback()
+            return [], errors
+        connection.commit()
+        return results, []
+
+    # ----------- Interfaz asíncrona -----------
+
+    async def add(self, task: Task) -> Task:
+        return await self.run(self._add, task)
+
+    async def get(self, task_id: int) -> Optional[Task]:
+        return await self.run(self._get, task_id)
+
+    async def page(self, limit: int, after: int = 0, completed: Optional[bool] = None,
+                   title_prefix: Optional[str] = None) -> Page:
+        return await self.run(self._page, limit, after, completed, title_prefix)
+
+    async def update(self, task_id: int, changes: UpdateTaskModel,
+                     expected_version: Optional[int] = None) -> Optional[Task]:
+        return await self.run(self._update, task_id, changes, expected_version)
+
+    async def delete(self, task_id: int, expected_version: Optional[int] = None) -> Optional[Task]:
+        return await self.run(self._delete, task_id, expected_version)
+
+    async def bulk(self, operations: List[BulkOperation]) -> Tuple[List[Task], List[dict]]:
+        return await self.run(self._bulk, operations)
+
+
+def create_repository(kind: str = TASKS_BACKEND) -> TaskRepository:
+    if kind == "memory":
+        return MemoryTaskRepository()
+    if kind == "sqlite":
+        return SQLiteTaskRepository()
+    raise ValueError(f"TASKS_BACKEND desconocido: {kind}")
+
+
+repository = create_repository()
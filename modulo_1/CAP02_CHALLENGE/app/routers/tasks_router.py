@@ -1,9 +1,47 @@
-from fastapi import APIRouter, HTTPException
-from models import Task, UpdateTaskModel, TaskList
-from db import db
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from db import VersionConflict
+from models import BulkOperation, Task, UpdateTaskModel, TaskList
+from repository import repository
 
 tasks_router = APIRouter()
 
+NDJSON = "application/x-ndjson"
+# Líneas de resultado que se agrupan en cada trozo de la respuesta en streaming
+BULK_CHUNK_LINES = 1000
+bulk_adapter = TypeAdapter(List[BulkOperation])
+EVENT_STREAM = "text/event-stream"
+# Segundos entre comentarios keep-alive del stream SSE sin cambios
+SSE_KEEPALIVE = 15
+
+
+def etag(task: Task) -> str:
+    return f'"{task.version}"'
+
+
+def expected_version(if_match: Optional[str]) -> Optional[int]:
+    """Versión pedida en If-Match (``"3"``, ``W/"3"`` o ``3``); None si no hay condición."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match debe ser la versión (ETag) de la tarea")
+
+
+def version_conflict(error: VersionConflict) -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail=f"La tarea cambió: versión actual {error.current_version}",
+        headers={"ETag": f'"{error.current_version}"'},
+    )
+
 """
 Crear una nueva tarea.
 
@@ -17,7 +55,155 @@ Devuelve:
 """
 @tasks_router.post("/", response_model=Task)
 async def create_task(task: Task):
-    return db.add_task(task)
+    return await repository.add(task)
+
+
+"""
+Crear, actualizar y eliminar tareas en lote.
+
+El cuerpo es un array JSON o NDJSON (``Content-Type: application/x-ndjson``,
+una operación por línea). Cada operación es ``{"op": "create", "task": {...}}``,
+``{"op": "update", "id": 1, "changes": {...}}`` o ``{"op": "delete", "id": 1}``.
+Un update o delete puede referirse a una tarea creada antes en el mismo lote.
+
+El lote es atómico: primero se comprueba entero y, si alguna operación falla,
+no se aplica ninguna. Si todo es válido se aplica en una sola pasada y el
+resultado de cada operación se devuelve en streaming como NDJSON, en el mismo
+orden que las operaciones. Cada línea muestra la tarea tal como quedó tras su
+propia operación: si el lote crea una tarea y luego la actualiza, la línea del
+create lleva la versión 1 y la del update la 2.
+
+Parámetros:
+    request (Request): La petición con el lote de operaciones.
+
+Devuelve:
+    StreamingResponse: Una línea NDJSON por operación con ``index``, ``op``,
+        ``status`` y la tarea afectada.
+
+Excepciones:
+    HTTPException: 400 si el cuerpo no se puede leer; 422 con la lista de
+        errores por elemento si alguna operación no es válida.
+"""
+@tasks_router.post("/bulk")
+async def bulk_tasks(request: Request):
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(NDJSON):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Cuerpo JSON/NDJSON inválido: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Se esperaba un array de operaciones")
+
+    try:
+        operations = bulk_adapter.validate_python(items)
+    except ValidationError as e:
+        errors = [
+            {"index": error["loc"][0], "error": f"{'.'.join(map(str, error['loc'][1:]))}: {error['msg']}"}
+            for error in e.errors()
+        ]
+        raise HTTPException(status_code=422, detail=errors)
+
+    results, errors = await repository.bulk(operations)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    def lines():
+        chunk = []
+        for index, (operation, task) in enumerate(zip(operations, results)):
+            status = 201 if operation.op == "create" else 200
+            chunk.append(json.dumps({"index": index, "op": operation.op, "status": status, "task": task.model_dump()}))
+            if len(chunk) == BULK_CHUNK_LINES:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON)
+
+
+"""
+Obtener los cambios de las tareas posteriores a una secuencia.
+
+Permite sincronizar un cliente por incrementos en lugar de descargar la lista
+completa. Cada cambio lleva su ``seq`` y es ``{"op": "put", "task": {...}}``
+(alta o modificación) o ``{"op": "delete", "id": ...}``. El cliente guarda
+el ``cursor`` de la respuesta y lo envía como ``since`` en la siguiente
+petición. El cursor incluye la época del arranque del servidor, porque las
+secuencias vuelven a empezar tras un reinicio.
+
+Con ``Accept: text/event-stream`` la respuesta es un stream SSE que no termina:
+cada cambio es un evento ``change`` con el cursor como ``id`` (al reconectar se
+respeta ``Last-Event-ID``). Si no, es long-poll: si no hay cambios se esperan
+hasta ``wait`` segundos y se devuelve lo que haya.
+
+Los cambios se guardan en un búfer acotado. Si ``since`` ya salió del búfer, o
+es de otro arranque del servidor, el cliente debe volver a cargar las tareas
+con ``GET /tasks`` y seguir desde el cursor indicado: en long-poll se responde
+410 con ese cursor en la cabecera ``X-Changes-Cursor``; en SSE se envía un
+evento ``resync`` con el cursor y se cierra el stream.
+
+Parámetros:
+    since (str): Último cursor que el cliente ya conoce (``0`` = ninguno).
+    limit (int): Número máximo de cambios por respuesta (1-1000).
+    wait (float): Segundos máximos de espera en long-poll (0-60).
+
+Devuelve:
+    dict: ``{"changes": [...], "cursor": <cursor del último cambio devuelto>}``,
+        o un stream SSE.
+
+Excepciones:
+    HTTPException: 410 si el cliente debe resincronizar; 501 si el backend de
+        tareas no publica cambios.
+"""
+@tasks_router.get("/changes")
+async def get_changes(
+    request: Request,
+    since: str = "0",
+    limit: int = Query(1000, ge=1, le=1000),
+    wait: float = Query(30, ge=0, le=60),
+):
+    feed = repository.feed
+    if feed is None:
+        raise HTTPException(status_code=501, detail="El backend de tareas no publica cambios")
+
+    if EVENT_STREAM in request.headers.get("accept", ""):
+        since = request.headers.get("last-event-id") or since
+
+        async def events():
+            seq = feed.position(since)
+            while not await request.is_disconnected():
+                changes = feed.since(seq, limit) if seq is not None else None
+                if changes is None:
+                    yield f"event: resync\ndata: {json.dumps({'cursor': feed.cursor(feed.seq)})}\n\n"
+                    return
+                if not changes:
+                    await feed.wait(seq, SSE_KEEPALIVE)
+                    if feed.seq == seq:
+                        yield ": keep-alive\n\n"
+                    continue
+                for seq, change in changes:
+                    yield f"id: {feed.cursor(seq)}\nevent: change\ndata: {json.dumps(change)}\n\n"
+
+        return StreamingResponse(events(), media_type=EVENT_STREAM, headers={"Cache-Control": "no-cache"})
+
+    seq = feed.position(since)
+    changes = feed.since(seq, limit) if seq is not None else None
+    if changes == [] and wait > 0:
+        await feed.wait(seq, wait)
+        changes = feed.since(seq, limit)
+    if changes is None:
+        raise HTTPException(
+            status_code=410,
+            detail="Los cambios pedidos ya no están disponibles: recarga las tareas",
+            headers={"X-Changes-Cursor": feed.cursor(feed.seq)},
+        )
+    return {
+        "changes": [{"seq": seq, **change} for seq, change in changes],
+        "cursor": feed.cursor(changes[-1][0] if changes else seq),
+    }
 
 
 """
@@ -30,65 +216,116 @@ Parámetros:
     task_id (int): El identificador único de la tarea a recuperar.
 
 Devuelve:
-    Task: La tarea con el ID especificado.
+    Task: La tarea con el ID especificado. La cabecera ETag lleva su versión,
+        que se puede enviar en If-Match al actualizarla o eliminarla.
 
 Excepciones:
     HTTPException: Si no se encuentra una tarea con el ID proporcionado.
 """
 @tasks_router.get("/{task_id}", response_model=Task)
-async def get_task(task_id: int):
-    task = db.get_task(task_id)
+async def get_task(task_id: int, response: Response):
+    task = await repository.get(task_id)
     if task is None:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    response.headers["ETag"] = etag(task)
     return task
 
 """
-Obtener todas las tareas.
+Obtener las tareas, paginadas por cursor.
+
+Devuelve como máximo ``limit`` tareas en orden de id. Para pedir la página
+siguiente se pasa como ``cursor`` el ``next_cursor`` de la respuesta anterior;
+cuando es None no quedan más tareas. Cada página se resuelve con los índices
+de la base de datos, sin recorrer el resto de tareas.
 
-Recupera todas las tareas de la base de datos y las devuelve como una lista.
+Parámetros:
+    cursor (int, opcional): Id de la última tarea de la página anterior.
+    limit (int): Número máximo de tareas de la página (1-1000).
+    completed (bool, opcional): Devuelve solo las tareas con ese estado.
+    title_prefix (str, opcional): Devuelve solo las tareas cuyo título empieza
+        por este texto (sin distinguir mayúsculas).
+    fields (str, opcional): Campos de cada tarea a incluir, separados por comas
+        (por ejemplo ``id,title``).
 
 Devuelve:
-    TaskList: Una lista que contiene todas las tareas en la base de datos.
+    TaskList: Las tareas de la página y el cursor de la siguiente.
+
+Excepciones:
+    HTTPException: Si ``fields`` contiene un campo que no existe.
 """
 @tasks_router.get("/", response_model=TaskList)
-async def get_tasks():
-    tasks = db.get_tasks()
-    return TaskList(tasks=tasks)
+async def get_tasks(
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    completed: Optional[bool] = None,
+    title_prefix: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    tasks, next_cursor = await repository.page(limit, cursor, completed, title_prefix)
+    if fields is None:
+        return TaskList(tasks=tasks, next_cursor=next_cursor)
+
+    include = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = include - set(Task.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(sorted(unknown))}")
+    # La proyección no encaja en TaskList (faltarían campos obligatorios)
+    return JSONResponse({
+        "tasks": [task.model_dump(include=include) for task in tasks],
+        "next_cursor": next_cursor,
+    })
 
 """
 Actualizar una tarea existente.
 
 Actualiza una tarea en la base de datos con el ID y los datos proporcionados.
+Con la cabecera If-Match solo se actualiza si la tarea sigue en esa versión,
+así dos clientes no se pisan los cambios.
 
 Parámetros:
     task_id (int): El identificador único de la tarea a actualizar.
     task_update (UpdateTaskModel): Los datos que se desean actualizar para la tarea.
+    if_match (str, opcional): ETag (versión) que el cliente leyó de la tarea.
 
 Devuelve:
-    Task: La tarea actualizada con los campos modificados.
+    Task: La tarea actualizada con los campos modificados y su nueva versión.
 
 Excepciones:
-    HTTPException: Si no se encuentra una tarea con el ID proporcionado.
+    HTTPException: 404 si no se encuentra una tarea con el ID proporcionado;
+        412 si la tarea ya no está en la versión de If-Match.
 """
 @tasks_router.put("/{task_id}", response_model=Task)
-async def update_task(task_id: int, task_update: UpdateTaskModel):
-    updated_task = db.update_task(task_id, task_update)
+async def update_task(task_id: int, task_update: UpdateTaskModel, response: Response,
+                      if_match: Optional[str] = Header(None)):
+    try:
+        updated_task = await repository.update(task_id, task_update, expected_version(if_match))
+    except VersionConflict as e:
+        raise version_conflict(e)
     if updated_task is None:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    response.headers["ETag"] = etag(updated_task)
     return updated_task
 
 """
 Eliminar una tarea.
 
-Elimina una tarea de la base de datos con el ID especificado.
+Elimina una tarea de la base de datos con el ID especificado. Con la
+cabecera If-Match solo se elimina si la tarea sigue en esa versión.
 
 Parámetros:
     task_id (int): El identificador único de la tarea a eliminar.
+    if_match (str, opcional): ETag (versión) que el cliente leyó de la tarea.
 
 Devuelve:
     dict: Un mensaje de confirmación indicando que la tarea fue eliminada exitosamente.
+
+Excepciones:
+    HTTPException: 412 si la tarea ya no está en la versión de If-Match.
 """
 @tasks_router.delete("/{task_id}")
-async def delete_task(task_id: int):
-    db.delete_task(task_id)
+async def delete_task(task_id: int, if_match: Optional[str] = Header(None)):
+    try:
+        await repository.delete(task_id, expected_version(if_match))
+    except VersionConflict as e:
+        raise version_conflict(e)
     return {"message": "Tarea eliminada exitosamente"}
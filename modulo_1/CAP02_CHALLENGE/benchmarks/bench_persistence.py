@@ -0,0 +1,93 @@
+# Benchmark de la persistencia de FakeDB (diario + instantáneas) a 1M de tareas.
+#
+# Mide:
+#   - throughput de escritura con group commit: N clientes concurrentes que
+#     crean una tarea y esperan a que esté en disco (await db.sync())
+#   - tiempo de recuperación solo desde el diario y desde una instantánea
+#
+# Uso (desde CAP02_CHALLENGE):
+#   PYTHONPATH=app python benchmarks/bench_persistence.py --tasks 1000000
+
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from typing import Tuple
+
+from db import FakeDB
+from models import Task
+from persistence import TaskJournal
+
+
+async def write_load(db: FakeDB, tasks: int, clients: int) -> float:
+    remaining = iter(range(tasks))
+
+    async def client():
+        for i in remaining:
+            db.add_task(Task(title=f"tarea {i}", completed=i % 2 == 0))
+            await db.sync()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - start
+
+
+def recover(directory: str) -> Tuple[float, int]:
+    db = FakeDB()
+    journal = TaskJournal(directory)
+    start = time.perf_counter()
+    journal.recover(db)
+    elapsed = time.perf_counter() - start
+    journal.close(snapshot=False)
+    return elapsed, len(db.tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de persistencia de tareas")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--durable-writes", type=int, default=20_000,
+                        help="tareas por medición de escritura con espera de fsync")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="tasks-bench-")
+    try:
+        for clients in args.clients:
+            run_dir = f"{directory}/write-{clients}"
+            db = FakeDB()
+            journal = TaskJournal(run_dir)
+            journal.recover(db)
+            elapsed = asyncio.run(write_load(db, args.durable_writes, clients))
+            journal.close(snapshot=False)
+            print(f"escritura durable  {clients:>5} clientes  {args.durable_writes / elapsed:>10.0f} tareas/s")
+
+        # Carga a 1M sin esperar al disco: el escritor agrupa todo lo pendiente
+        db = FakeDB()
+        journal = TaskJournal(directory, snapshot_every=10**12)
+        journal.recover(db)
+        start = time.perf_counter()
+        for i in range(args.tasks):
+            db.add_task(Task(title=f"tarea {i}", completed=i % 2 == 0))
+        journal.close(snapshot=False)
+        elapsed = time.perf_counter() - start
+        print(f"escritura en lote  {args.tasks} tareas  {args.tasks / elapsed:>10.0f} tareas/s")
+
+        elapsed, count = recover(directory)
+        print(f"recuperación desde el diario       {count} tareas  {elapsed:.2f} s")
+
+        db = FakeDB()
+        journal = TaskJournal(directory)
+        journal.recover(db)
+        start = time.perf_counter()
+        journal.close(snapshot=True)
+        print(f"instantánea                        {len(db.tasks)} tareas  {time.perf_counter() - start:.2f} s")
+
+        elapsed, count = recover(directory)
+        print(f"recuperación desde la instantánea  {count} tareas  {elapsed:.2f} s")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
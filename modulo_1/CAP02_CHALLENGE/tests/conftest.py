@@ -0,0 +1,5 @@
+import os
+import sys
+
+# La aplicación importa sus módulos desde app/ (se arranca con ``cd app``)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
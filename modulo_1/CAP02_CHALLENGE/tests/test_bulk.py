@@ -0,0 +1,49 @@
+# Tests de POST /tasks/bulk
+
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def bulk(operations):
+    return client.post("/tasks/bulk", json=operations)
+
+
+def test_each_line_shows_the_task_after_its_own_operation():
+    created = client.post("/tasks/", json={"title": "base"}).json()
+    next_id = created["id"] + 1
+
+    response = bulk([
+        {"op": "create", "task": {"title": "nueva"}},
+        {"op": "update", "id": next_id, "changes": {"completed": True}},
+        {"op": "delete", "id": created["id"]},
+    ])
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["op"], line["status"]) for line in lines] == [("create", 201), ("update", 200), ("delete", 200)]
+    assert lines[0]["task"]["id"] == next_id
+    assert (lines[0]["task"]["version"], lines[0]["task"]["completed"]) == (1, False)
+    assert (lines[1]["task"]["version"], lines[1]["task"]["completed"]) == (2, True)
+    assert client.get(f"/tasks/{created['id']}").status_code == 404
+
+
+def test_invalid_batch_applies_nothing():
+    before = client.post("/tasks/", json={"title": "intacta"}).json()
+    response = bulk([
+        {"op": "update", "id": before["id"], "changes": {"title": "cambiada"}},
+        {"op": "delete", "id": 10**9},
+    ])
+    assert response.status_code == 422
+    assert response.json()["detail"] == [{"index": 1, "error": "Tarea no encontrada"}]
+    assert client.get(f"/tasks/{before['id']}").json()["title"] == "intacta"
+
+
+def test_ndjson_body():
+    body = "\n".join(json.dumps({"op": "create", "task": {"title": f"nd {i}"}}) for i in range(3))
+    response = client.post("/tasks/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 3
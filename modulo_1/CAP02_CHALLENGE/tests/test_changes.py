@@ -0,0 +1,154 @@
+# Tests del registro de cambios (GET /tasks/changes)
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from changes import ChangeFeed
+from main import app
+from models import Task
+from repository import repository
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def current_cursor(client) -> str:
+    response = client.get("/tasks/changes", params={"since": "0", "wait": 0})
+    if response.status_code == 410:
+        return response.headers["X-Changes-Cursor"]
+    return response.json()["cursor"]
+
+
+# ----------- ChangeFeed -----------
+
+def test_since_returns_changes_after_seq():
+    feed = ChangeFeed(size=10)
+    feed.publish([{"op": "delete", "id": 1}, {"op": "delete", "id": 2}, {"op": "delete", "id": 3}])
+    assert feed.since(1, 10) == [(2, {"op": "delete", "id": 2}), (3, {"op": "delete", "id": 3})]
+    assert feed.since(1, 1) == [(2, {"op": "delete", "id": 2})]
+    assert feed.since(3, 10) == []
+
+
+def test_since_requires_resync_when_seq_left_the_buffer():
+    feed = ChangeFeed(size=2)
+    feed.publish([{"op": "delete", "id": i} for i in range(5)])
+    assert feed.since(2, 10) is None
+    assert feed.since(3, 10) == [(4, {"op": "delete", "id": 3}), (5, {"op": "delete", "id": 4})]
+    # Secuencia posterior a la actual: es de otro arranque
+    assert feed.since(6, 10) is None
+
+
+def test_cursor_of_another_epoch_is_rejected():
+    feed, restarted = ChangeFeed(), ChangeFeed()
+    feed.publish([{"op": "delete", "id": 1}])
+    restarted.publish([{"op": "delete", "id": 1}, {"op": "delete", "id": 2}])
+    cursor = feed.cursor(1)
+    assert feed.position(cursor) == 1
+    # El reinicio tiene más cambios que el cursor: sin época se confundirían
+    assert restarted.position(cursor) is None
+    assert restarted.position("0") == 0
+    assert restarted.position("basura") is None
+
+
+def test_wait_returns_when_a_change_is_published():
+    async def scenario():
+        feed = ChangeFeed()
+        waiter = asyncio.create_task(feed.wait(0, timeout=5))
+        await asyncio.sleep(0)
+        feed.publish([{"op": "delete", "id": 1}])
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(scenario())
+
+
+# ----------- Endpoint -----------
+
+def test_long_poll_returns_new_changes(client):
+    cursor = current_cursor(client)
+    created = client.post("/tasks/", json={"title": "feed"}).json()
+
+    body = client.get("/tasks/changes", params={"since": cursor, "wait": 0}).json()
+    assert [change["op"] for change in body["changes"]] == ["put"]
+    assert body["changes"][0]["task"] == created
+
+    # Con el cursor nuevo no hay más cambios
+    body = client.get("/tasks/changes", params={"since": body["cursor"], "wait": 0}).json()
+    assert body["changes"] == []
+
+
+def test_long_poll_waits_for_a_change(client):
+    cursor = current_cursor(client)
+
+    async def create_later():
+        await asyncio.sleep(0.1)
+        await repository.add(Task(title="later"))
+
+    client.portal.start_task_soon(create_later)
+    body = client.get("/tasks/changes", params={"since": cursor, "wait": 5}).json()
+    assert body["changes"][0]["task"]["title"] == "later"
+
+
+def test_cursor_from_before_a_restart_gets_410(client):
+    epoch = repository.feed.epoch
+    response = client.get("/tasks/changes", params={"since": f"otra{epoch}-1", "wait": 0})
+    assert response.status_code == 410
+    assert response.headers["X-Changes-Cursor"] == repository.feed.cursor(repository.feed.seq)
+
+
+async def sse_events(path: str, count: int, headers=()) -> list:
+    """Lee ``count`` eventos de un stream SSE de la app y se desconecta."""
+    received = b""
+    done = asyncio.Event()
+    sent_request = False
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += message.get("body", b"")
+            if received.count(b"\n\n") >= count or not message.get("more_body"):
+                done.set()
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"accept", b"text/event-stream"), *headers],
+    }
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    events = []
+    for block in received.decode().split("\n\n")[:count]:
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        events.append(fields)
+    return events
+
+
+def test_sse_streams_changes_with_cursor_ids(client):
+    cursor = current_cursor(client)
+    client.post("/tasks/", json={"title": "sse 1"})
+    client.post("/tasks/", json={"title": "sse 2"})
+
+    events = client.portal.call(sse_events, f"/tasks/changes?since={cursor}", 2)
+    assert [json.loads(event["data"])["task"]["title"] for event in events] == ["sse 1", "sse 2"]
+    assert all(event["event"] == "change" for event in events)
+    assert repository.feed.position(events[-1]["id"]) == repository.feed.seq
+
+
+def test_sse_sends_resync_for_a_foreign_last_event_id(client):
+    events = client.portal.call(sse_events, "/tasks/changes", 1, [(b"last-event-id", b"x-1")])
+    assert events[0]["event"] == "resync"
+    assert json.loads(events[0]["data"])["cursor"] == repository.feed.cursor(repository.feed.seq)
@@ -0,0 +1,46 @@
+# Tests del store indexado de FakeDB (ids monotónicos e índices secundarios)
+
+import random
+
+from db import ALL, FakeDB, prefix_keys, status_key
+from models import Task, UpdateTaskModel
+
+
+def test_ids_are_not_reused_after_deleting_the_last_one():
+    db = FakeDB()
+    for i in range(3):
+        db.add_task(Task(title=f"tarea {i}"))
+    db.delete_task(3)
+    db.delete_task(2)
+    assert db.add_task(Task(title="nueva")).id == 4
+
+
+def test_indexes_match_a_full_scan_after_compaction():
+    db = FakeDB()
+    rng = random.Random(0)
+    titles = ["alfa", "Alba", "beta", "Ñandú", "ñu", "gamma"]
+    for i in range(200):
+        db.add_task(Task(title=rng.choice(titles), completed=i % 3 == 0))
+
+    compactions = 0
+    for _ in range(2000):
+        task_id = rng.randint(1, db.next_id - 1)
+        if task_id not in db.tasks:
+            continue
+        sizes = {key: len(ids) for key, ids in db.indexes.items()}
+        if rng.random() < 0.05:
+            db.delete_task(task_id)
+        else:
+            db.update_task(task_id, UpdateTaskModel(title=rng.choice(titles), completed=rng.random() < 0.5))
+        # Sin compactar, las listas solo crecen
+        compactions += sum(len(db.indexes[key]) < size for key, size in sizes.items())
+    assert compactions > 10
+
+    keys = {ALL, status_key(True), status_key(False)}
+    for title in titles:
+        keys.update(prefix_keys(title))
+    for key in keys:
+        expected = [task for task in db.tasks.values() if db.matches(task, key)]
+        assert list(db.scan(key)) == sorted(expected, key=lambda task: task.id)
+        # Las entradas obsoletas nunca superan la mitad de la lista
+        assert db.stale.get(key, 0) * 2 <= len(db.indexes.get(key, []))
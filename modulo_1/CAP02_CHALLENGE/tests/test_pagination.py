@@ -0,0 +1,109 @@
+# Tests de la paginación por cursor, los filtros y la proyección de GET /tasks
+
+import random
+
+from fastapi.testclient import TestClient
+
+from db import FakeDB, status_key
+from main import app
+from models import Task
+
+client = TestClient(app)
+
+
+def all_pages(db: FakeDB, limit: int, **filters):
+    """Recorre todas las páginas; devuelve los ids vistos y los cursores."""
+    seen, cursors, cursor = [], [], 0
+    while True:
+        page, cursor = db.get_page(limit, cursor, **filters)
+        seen += [task.id for task in page]
+        if cursor is None:
+            return seen, cursors
+        cursors.append(cursor)
+
+
+def test_pages_have_no_duplicates_or_gaps_with_deletes_in_between():
+    db = FakeDB()
+    for i in range(100):
+        db.add_task(Task(title=f"tarea {i}", completed=i % 2 == 0))
+    rng = random.Random(1)
+
+    seen, cursor = [], 0
+    while cursor is not None:
+        page, cursor = db.get_page(7, cursor)
+        assert len(page) == 7 or cursor is None
+        seen += [task.id for task in page]
+        # Se borran tareas ya vistas y pendientes entre página y página
+        for task_id in rng.sample(sorted(db.tasks), min(3, len(db.tasks))):
+            db.delete_task(task_id)
+        remaining = set(db.tasks)
+
+    assert len(seen) == len(set(seen))
+    assert seen == sorted(seen)
+    # Todo lo que sigue existiendo al final se ha visto
+    assert remaining <= set(seen)
+
+
+def test_next_cursor_is_none_on_the_last_page():
+    db = FakeDB()
+    for i in range(10):
+        db.add_task(Task(title=f"tarea {i}"))
+    seen, cursors = all_pages(db, 5)
+    assert seen == list(range(1, 11))
+    assert cursors == [5]
+    assert db.get_page(5, 10) == ([], None)
+
+
+def test_filters_combine_status_and_title_prefix():
+    db = FakeDB()
+    for i in range(60):
+        db.add_task(Task(title=["Compra pan", "compra leche", "Llamar"][i % 3], completed=i % 4 == 0))
+
+    seen, _ = all_pages(db, 4, completed=True, title_prefix="COMPRA")
+    expected = [
+        task.id for task in db.tasks.values()
+        if task.completed and task.title.casefold().startswith("compra")
+    ]
+    assert seen == expected
+    seen, _ = all_pages(db, 4, title_prefix="compra l")
+    assert seen == [task.id for task in db.tasks.values() if task.title == "compra leche"]
+
+
+def test_page_walks_the_shorter_index():
+    db = FakeDB()
+    for i in range(50):
+        db.add_task(Task(title=f"común {i}", completed=i == 10))
+    walked = []
+    scan = db.scan
+
+    def recording_scan(key, after=0):
+        walked.append(key)
+        return scan(key, after)
+
+    db.scan = recording_scan
+    page, cursor = db.get_page(10, completed=True, title_prefix="com")
+    assert [task.id for task in page] == [11]
+    assert cursor is None
+    assert walked == [status_key(True)]
+
+
+def test_fields_projection():
+    created = client.post("/tasks/", json={"title": "proyección zq", "description": "oculta"}).json()
+    response = client.get("/tasks/", params={"title_prefix": "proyección zq", "fields": "id,title"})
+    assert response.status_code == 200
+    assert response.json() == {"tasks": [{"id": created["id"], "title": "proyección zq"}], "next_cursor": None}
+
+    response = client.get("/tasks/", params={"fields": "id,secreto"})
+    assert response.status_code == 400
+
+
+def test_api_pages_with_cursor():
+    ids = [client.post("/tasks/", json={"title": f"paginada xk {i}"}).json()["id"] for i in range(5)]
+    params = {"title_prefix": "paginada xk", "limit": 2}
+    first = client.get("/tasks/", params=params).json()
+    assert [task["id"] for task in first["tasks"]] == ids[:2]
+    second = client.get("/tasks/", params={**params, "cursor": first["next_cursor"]}).json()
+    assert [task["id"] for task in second["tasks"]] == ids[2:4]
+    third = client.get("/tasks/", params={**params, "cursor": second["next_cursor"]}).json()
+    assert [task["id"] for task in third["tasks"]] == ids[4:]
+    assert third["next_cursor"] is None
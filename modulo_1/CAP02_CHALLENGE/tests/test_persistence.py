@@ -0,0 +1,111 @@
+# Tests del diario y las instantáneas de FakeDB
+
+import os
+
+import pytest
+
+import persistence
+from db import ALL, FakeDB
+from models import Task, UpdateTaskModel
+from persistence import SNAPSHOT_FILE, TaskJournal
+
+
+def state(db: FakeDB):
+    return [task.model_dump() for task in db.tasks.values()], db.next_id
+
+
+def fill(db: FakeDB):
+    for i in range(10):
+        db.add_task(Task(title=f"tarea {i}", completed=i % 2 == 0))
+    db.update_task(3, UpdateTaskModel(title="cambiada", completed=True))
+    db.delete_task(5)
+
+
+def recovered(directory, **options) -> FakeDB:
+    db = FakeDB()
+    journal = TaskJournal(str(directory), **options)
+    journal.recover(db)
+    journal.close(snapshot=False)
+    return db
+
+
+def test_recovers_from_journal(tmp_path):
+    db = FakeDB()
+    journal = TaskJournal(str(tmp_path))
+    journal.recover(db)
+    fill(db)
+    journal.close(snapshot=False)
+
+    copy = recovered(tmp_path)
+    assert state(copy) == state(db)
+    assert copy.get_task(3).version == 2
+    assert copy.get_page(100, completed=True)[0] == db.get_page(100, completed=True)[0]
+
+
+def test_torn_final_line_is_ignored(tmp_path):
+    db = FakeDB()
+    journal = TaskJournal(str(tmp_path))
+    journal.recover(db)
+    fill(db)
+    journal.close(snapshot=False)
+    segment = journal.segment_path(journal.generation)
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write('["p",99,"a medio')
+
+    assert state(recovered(tmp_path)) == state(db)
+
+
+def test_recovers_from_snapshot_and_later_segments(tmp_path):
+    db = FakeDB()
+    journal = TaskJournal(str(tmp_path), snapshot_every=4)
+    journal.recover(db)
+    fill(db)
+    journal.snapshot_thread.join()
+    db.add_task(Task(title="después de la instantánea"))
+    journal.close(snapshot=False)
+
+    assert os.path.exists(tmp_path / SNAPSHOT_FILE)
+    assert state(recovered(tmp_path)) == state(db)
+
+
+def test_recovering_the_same_store_twice_does_not_duplicate(tmp_path):
+    db = FakeDB()
+    journal = TaskJournal(str(tmp_path))
+    journal.recover(db)
+    fill(db)
+    journal.close()
+    before = state(db)
+
+    # Como al volver a entrar en el lifespan en el mismo proceso
+    journal = TaskJournal(str(tmp_path))
+    journal.recover(db)
+    assert state(db) == before
+    ids = db.indexes[ALL]
+    assert ids == sorted(ids) and len(ids) == len(db.tasks)
+    with pytest.raises(RuntimeError):
+        TaskJournal(str(tmp_path)).recover(db)
+    journal.close(snapshot=False)
+
+
+# El error de la instantánea se lanza en su hilo
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_failed_snapshot_does_not_disable_snapshots(tmp_path, monkeypatch):
+    db = FakeDB()
+    journal = TaskJournal(str(tmp_path), snapshot_every=3)
+    journal.recover(db)
+
+    def fail(directory):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(persistence, "fsync_directory", fail)
+    for i in range(3):
+        db.add_task(Task(title=f"tarea {i}"))
+    journal.snapshot_thread.join()
+    assert not journal.snapshotting
+
+    monkeypatch.undo()
+    for i in range(3):
+        db.add_task(Task(title=f"otra {i}"))
+    journal.snapshot_thread.join()
+    journal.close(snapshot=False)
+    assert state(recovered(tmp_path)) == state(db)
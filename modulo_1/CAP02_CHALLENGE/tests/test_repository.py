@@ -0,0 +1,108 @@
+# Tests de los repositorios de tareas: mismas respuestas en memoria y en SQLite
+
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from changes import ChangeFeed
+from db import FakeDB
+from main import app
+from repository import MemoryTaskRepository, SQLiteTaskRepository
+from routers import tasks_router
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def client(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        repository = MemoryTaskRepository(FakeDB(), ChangeFeed())
+    else:
+        repository = SQLiteTaskRepository(str(tmp_path / "tasks.db"), pool_size=2)
+    asyncio.run(repository.open())
+    monkeypatch.setattr(tasks_router, "repository", repository)
+    yield TestClient(app)
+    asyncio.run(repository.close())
+
+
+def create(client, title, completed=False):
+    response = client.post("/tasks/", json={"title": title, "completed": completed})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_crud(client):
+    task = create(client, "comprar pan")
+    assert (task["id"], task["version"], task["completed"]) == (1, 1, False)
+    assert client.get("/tasks/1").json() == task
+
+    response = client.put("/tasks/1", json={"completed": True})
+    assert response.status_code == 200
+    assert response.json() == {**task, "completed": True, "version": 2}
+
+    assert client.delete("/tasks/1").status_code == 200
+    assert client.get("/tasks/1").status_code == 404
+    assert client.put("/tasks/1", json={"title": "x"}).status_code == 404
+    # Los ids no se reutilizan tras un borrado
+    assert create(client, "otra")["id"] == 2
+
+
+def test_paging_and_filters(client):
+    titles = ["Ñandú veloz", "ñandú lento", "Nandu", "ÑU", "compra"]
+    for i, title in enumerate(titles * 3):
+        create(client, title, completed=i % 2 == 0)
+
+    def ids(**params):
+        seen, cursor = [], 0
+        while cursor is not None:
+            page = client.get("/tasks/", params={**params, "cursor": cursor, "limit": 2}).json()
+            seen += [task["id"] for task in page["tasks"]]
+            cursor = page["next_cursor"]
+        return seen
+
+    assert ids() == list(range(1, 16))
+    assert ids(completed=True) == list(range(1, 16, 2))
+    # El prefijo no distingue mayúsculas tampoco fuera de ASCII
+    assert ids(title_prefix="ÑAN") == [1, 2, 6, 7, 11, 12]
+    assert ids(title_prefix="ñandú v", completed=False) == [6]
+    assert ids(title_prefix="%") == []
+
+    projected = client.get("/tasks/", params={"fields": "id,title", "limit": 1}).json()
+    assert projected == {"tasks": [{"id": 1, "title": "Ñandú veloz"}], "next_cursor": 1}
+
+
+def test_if_match(client):
+    task = create(client, "versionada")
+    response = client.put(f"/tasks/{task['id']}", json={"title": "b"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+
+    response = client.put(f"/tasks/{task['id']}", json={"title": "c"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 412
+    assert response.headers["ETag"] == '"2"'
+    assert client.delete(f"/tasks/{task['id']}", headers={"If-Match": '"1"'}).status_code == 412
+    assert client.delete(f"/tasks/{task['id']}", headers={"If-Match": '"2"'}).status_code == 200
+
+
+def test_sqlite_backfills_title_key(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+            "description TEXT, completed INTEGER NOT NULL DEFAULT 0)"
+        )
+        connection.execute("INSERT INTO tasks (title) VALUES ('Ñandú')")
+    connection.close()
+
+    repository = SQLiteTaskRepository(path, pool_size=1)
+
+    async def scenario():
+        await repository.open()
+        try:
+            return await repository.page(10, title_prefix="ñan")
+        finally:
+            await repository.close()
+
+    tasks, cursor = asyncio.run(scenario())
+    assert [(task.title, task.version) for task in tasks] == [("Ñandú", 1)]
+    assert cursor is None
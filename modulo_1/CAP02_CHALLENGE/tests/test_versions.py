@@ -0,0 +1,141 @@
+# Tests del versionado de tareas (ETag / If-Match)
+
+import threading
+
+from fastapi.testclient import TestClient
+
+from db import FakeDB, VersionConflict
+from main import app
+from models import Task, UpdateTaskModel
+
+client = TestClient(app)
+
+
+def create(title="versionada"):
+    response = client.post("/tasks/", json={"title": title})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_new_task_has_version_1_and_etag():
+    task = create()
+    assert task["version"] == 1
+    response = client.get(f"/tasks/{task['id']}")
+    assert response.headers["ETag"] == '"1"'
+
+
+def test_update_with_matching_if_match_bumps_version():
+    task = create()
+    response = client.put(f"/tasks/{task['id']}", json={"completed": True}, headers={"If-Match": '"1"'})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] == '"2"'
+    # Formatos aceptados: débil y sin comillas
+    assert client.put(f"/tasks/{task['id']}", json={"title": "b"}, headers={"If-Match": 'W/"2"'}).status_code == 200
+    assert client.put(f"/tasks/{task['id']}", json={"title": "c"}, headers={"If-Match": "3"}).status_code == 200
+
+
+def test_stale_if_match_gets_412_with_current_etag():
+    task = create()
+    client.put(f"/tasks/{task['id']}", json={"title": "otro cliente"})
+    response = client.put(f"/tasks/{task['id']}", json={"title": "pisado"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 412
+    assert response.headers["ETag"] == '"2"'
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "otro cliente"
+
+
+def test_delete_with_stale_if_match_gets_412():
+    task = create()
+    client.put(f"/tasks/{task['id']}", json={"title": "cambiada"})
+    assert client.delete(f"/tasks/{task['id']}", headers={"If-Match": '"1"'}).status_code == 412
+    assert client.delete(f"/tasks/{task['id']}", headers={"If-Match": '"2"'}).status_code == 200
+    assert client.get(f"/tasks/{task['id']}").status_code == 404
+
+
+def test_invalid_if_match_gets_400_and_wildcard_matches_any():
+    task = create()
+    assert client.put(f"/tasks/{task['id']}", json={"title": "x"}, headers={"If-Match": "abc"}).status_code == 400
+    assert client.put(f"/tasks/{task['id']}", json={"title": "x"}, headers={"If-Match": "*"}).status_code == 200
+
+
+def test_concurrent_conditional_updates_lose_nothing():
+    db = FakeDB()
+    task = db.add_task(Task(title="0"))
+
+    def increment(times):
+        for _ in range(times):
+            while True:
+                current = db.get_task(task.id)
+                try:
+                    db.update_task(task.id, UpdateTaskModel(title=str(int(current.title) + 1)), current.version)
+                    break
+                except VersionConflict:
+                    pass
+
+    threads = [threading.Thread(target=increment, args=(500,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert db.get_task(task.id).title == "2000"
+    assert db.get_task(task.id).version == 2001
+
+
+def test_cursor_pages_never_skip_concurrently_created_ids():
+    db = FakeDB()
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            db.add_task(Task(title="nueva"))
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        seen, cursor = [], 0
+        while len(seen) < 5000:
+            page, next_cursor = db.get_page(50, cursor)
+            seen += [task.id for task in page]
+            cursor = page[-1].id if page else cursor
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert seen == list(range(1, len(seen) + 1))
+
+
+def run_threads(target, args_list):
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_updates_to_different_ids():
+    db = FakeDB()
+    tasks = [db.add_task(Task(title=f"tarea {i}")) for i in range(8)]
+
+    def toggle(task_id, times):
+        for i in range(times):
+            db.update_task(task_id, UpdateTaskModel(completed=i % 2 == 0))
+
+    run_threads(toggle, [(task.id, 501) for task in tasks])
+    assert [db.get_task(task.id).version for task in tasks] == [502] * 8
+    # Los índices acaban igual que si los cambios hubieran sido secuenciales
+    assert [task.id for task in db.get_tasks(completed=True)] == [task.id for task in tasks]
+    assert db.get_tasks(completed=False) == []
+
+
+def test_concurrent_updates_to_same_id_keep_every_version():
+    db = FakeDB()
+    task = db.add_task(Task(title="compartida"))
+
+    def update(name):
+        for i in range(500):
+            db.update_task(task.id, UpdateTaskModel(description=f"{name} {i}"))
+
+    run_threads(update, [(name,) for name in "abcd"])
+    # Ninguna actualización se pierde: cada una parte de la versión anterior
+    assert db.get_task(task.id).version == 2001
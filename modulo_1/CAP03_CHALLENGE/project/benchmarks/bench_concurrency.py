@@ -0,0 +1,100 @@
+"""Concurrency benchmark for the orchestrator cache and /streamingSearch.
+
+Runs the same workload sequentially and with N concurrent clients and prints
+the wall time of both. If requests serialize (blocking I/O on the event loop)
+the concurrent run takes about as long as the sequential one; if they overlap
+it approaches the time of a single request.
+
+    # Redis cache only (needs the `cache` service from docker-compose):
+    PYTHONPATH=src/orchestrator python benchmarks/bench_concurrency.py cache --redis-host localhost
+
+    # End to end against a running orchestrator:
+    python benchmarks/bench_concurrency.py http --url http://localhost:8000 --query "what is rag"
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+import numpy as np
+
+
+async def timed(coroutines) -> tuple[float, list[float]]:
+    latencies = []
+
+    async def run(coroutine):
+        start = time.perf_counter()
+        await coroutine
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, sequential: float, concurrent: float, latencies: list[float], clients: int):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(
+        f"{name:<10} clients={clients:<4} sequential={sequential:8.3f}s "
+        f"concurrent={concurrent:8.3f}s speedup=x{sequential / concurrent:5.1f} "
+        f"p50={p50 * 1000:8.1f}ms p99={p99 * 1000:8.1f}ms"
+    )
+
+
+async def bench_cache(args):
+    from retrieval.cache import RedisVectorCache, create_pool
+
+    pool = create_pool(host=args.redis_host, port=args.redis_port, max_connections=args.clients)
+    cache = RedisVectorCache(pool)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.clients, args.dimension)).astype(np.float32).tolist()
+    try:
+        start = time.perf_counter()
+        for vector in vectors:
+            await cache.find_similar(vector, k=args.k)
+        sequential = time.perf_counter() - start
+
+        concurrent, latencies = await timed(cache.find_similar(vector, k=args.k) for vector in vectors)
+        report("cache", sequential, concurrent, latencies, args.clients)
+    finally:
+        await pool.disconnect()
+
+
+async def streaming_search(session: aiohttp.ClientSession, url: str, query: str):
+    async with session.get(f"{url}/streamingSearch", params={"query": query}) as response:
+        async for _ in response.content:
+            pass
+
+
+async def bench_http(args):
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        start = time.perf_counter()
+        for _ in range(args.clients):
+            await streaming_search(session, args.url, args.query)
+        sequential = time.perf_counter() - start
+
+        concurrent, latencies = await timed(
+            streaming_search(session, args.url, args.query) for _ in range(args.clients)
+        )
+        report("http", sequential, concurrent, latencies, args.clients)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", choices=["cache", "http"])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--redis-host", default="localhost")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--query", default="what is retrieval augmented generation")
+    args = parser.parse_args()
+
+    asyncio.run(bench_cache(args) if args.target == "cache" else bench_http(args))
+
+
+if __name__ == "__main__":
+    main()
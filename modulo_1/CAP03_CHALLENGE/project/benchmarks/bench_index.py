@@ -0,0 +1,156 @@
+"""Recall@k and latency of FLAT vs HNSW vector indexes on Redis Stack.
+
+Loads synthetic clustered vectors under a bench: prefix indexed by one FLAT
+and one HNSW index (same settings as RedisVectorCache.init_index), grows the
+set through each --sizes step and, at every step, runs the same KNN queries
+against both. FLAT is exact, so its hits are the ground truth for the HNSW
+recall. Everything the benchmark creates is deleted at the end.
+
+    # Needs the `cache` service from docker-compose; 1M x 1536 float32
+    # vectors take more than 12 GB in Redis, use --dimension to shrink them:
+    PYTHONPATH=src/orchestrator python benchmarks/bench_index.py --redis-host localhost
+    PYTHONPATH=src/orchestrator python benchmarks/bench_index.py --sizes 10000 100000 \\
+        --ef-runtime 10 50 200 --vector-type FLOAT16
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import redis.asyncio as aioredis
+from redis.commands.search.field import TextField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+
+from retrieval.cache import (
+    IndexSettings,
+    create_pool,
+    knn_hits,
+    knn_query,
+    search_args,
+    to_info,
+    to_text,
+)
+
+PREFIX = "bench:chunks:"
+FLAT_INDEX = "bench:idx:flat"
+HNSW_INDEX = "bench:idx:hnsw"
+CLUSTERS = 1000
+LOAD_BATCH = 1000
+
+
+class Vectors:
+    """Deterministic mixture of gaussian clusters, generated in batches."""
+
+    def __init__(self, dimension: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.centers = rng.standard_normal((CLUSTERS, dimension)).astype(np.float32)
+        self.dimension = dimension
+
+    def batch(self, start: int, count: int) -> np.ndarray:
+        rng = np.random.default_rng(start + 1)
+        centers = self.centers[rng.integers(0, CLUSTERS, count)]
+        return centers + 0.3 * rng.standard_normal((count, self.dimension)).astype(np.float32)
+
+
+async def create_index(client: aioredis.Redis, name: str, settings: IndexSettings, dimension: int):
+    await client.ft(name).create_index(
+        fields=(TextField("text"), settings.vector_field(dimension)),
+        definition=IndexDefinition(prefix=[PREFIX], index_type=IndexType.HASH),
+    )
+
+
+async def load(client: aioredis.Redis, vectors: Vectors, settings: IndexSettings, start: int, stop: int):
+    for offset in range(start, stop, LOAD_BATCH):
+        batch = vectors.batch(offset, min(LOAD_BATCH, stop - offset))
+        pipeline = client.pipeline(transaction=False)
+        for i, vector in enumerate(batch, offset):
+            pipeline.hset(f"{PREFIX}{i}", mapping={"text": str(i), "vector": settings.encode(vector)})
+        await pipeline.execute()
+
+
+async def wait_indexed(client: aioredis.Redis, name: str, size: int) -> dict:
+    while True:
+        info = to_info(await client.ft(name).info())
+        if int(to_text(info["num_docs"])) >= size and float(to_text(info["percent_indexed"])) >= 1:
+            return info
+        await asyncio.sleep(0.5)
+
+
+async def knn(client: aioredis.Redis, index: str, queries: list[bytes], k: int, ef_runtime=None):
+    """Runs the queries one at a time; returns the hit keys and the latencies."""
+    query = knn_query(k, "text", ef_runtime=ef_runtime)
+    results, latencies = [], []
+    for vector in queries:
+        start = time.perf_counter()
+        reply = await client.execute_command("FT.SEARCH", *search_args(query, vector, index))
+        latencies.append(time.perf_counter() - start)
+        results.append({to_text(hit["text"]) for hit in knn_hits(reply)})
+    return results, latencies
+
+
+def report(name: str, size: int, latencies: list[float], recall: float, info: dict):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    memory = float(to_text(info.get("vector_index_sz_mb", 0)))
+    print(
+        f"{name:<16} size={size:>8} recall={recall:6.3f} "
+        f"p50={p50 * 1000:8.2f}ms p99={p99 * 1000:8.2f}ms index={memory:9.1f}MB"
+    )
+
+
+async def bench(args):
+    flat = IndexSettings(algorithm="FLAT", vector_type=args.vector_type)
+    hnsw = IndexSettings(
+        algorithm="HNSW",
+        vector_type=args.vector_type,
+        m=args.m,
+        ef_construction=args.ef_construction,
+    )
+    pool = create_pool(host=args.redis_host, port=args.redis_port, max_connections=4)
+    client = aioredis.Redis(connection_pool=pool)
+    vectors = Vectors(args.dimension)
+    # Same clusters as the data, from a seed no loaded batch uses
+    queries = [flat.encode(vector) for vector in vectors.batch(10**9, args.queries)]
+    try:
+        await create_index(client, FLAT_INDEX, flat, args.dimension)
+        await create_index(client, HNSW_INDEX, hnsw, args.dimension)
+        loaded = 0
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            await load(client, vectors, flat, loaded, size)
+            flat_info = await wait_indexed(client, FLAT_INDEX, size)
+            hnsw_info = await wait_indexed(client, HNSW_INDEX, size)
+            print(f"loaded and indexed {size - loaded} vectors in {time.perf_counter() - start:.1f}s")
+            loaded = size
+
+            truth, latencies = await knn(client, FLAT_INDEX, queries, args.k)
+            report("FLAT", size, latencies, 1.0, flat_info)
+            for ef_runtime in args.ef_runtime:
+                hits, latencies = await knn(client, HNSW_INDEX, queries, args.k, ef_runtime)
+                recall = np.mean([len(found & exact) / args.k for found, exact in zip(hits, truth)])
+                report(f"HNSW ef={ef_runtime}", size, latencies, recall, hnsw_info)
+    finally:
+        await client.ft(FLAT_INDEX).dropindex(delete_documents=False)
+        await client.ft(HNSW_INDEX).dropindex(delete_documents=True)
+        await pool.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--redis-host", default="localhost")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vector-type", default="FLOAT32", choices=["FLOAT32", "FLOAT16"])
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-runtime", type=int, nargs="+", default=[10, 50, 100])
+    args = parser.parse_args()
+
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from sse_starlette.sse import EventSourceResponse
 from util import logger
 
@@ -7,7 +9,14 @@ import prompt
 import openai
 from retrieval import Retriever
 from retrieval.search import GoogleAPI
-from retrieval.cache import RedisVectorCache
+from retrieval.cache import (
+    VECTOR_CACHE_BACKEND,
+    VECTOR_CACHE_DIR,
+    LocalVectorCache,
+    RedisVectorCache,
+    VectorDbCache,
+    create_pool,
+)
 from retrieval.scraper import ScraperLocal, ScraperRemote
 from retrieval.embeddings import OpenAIEmbeddings, RemoteEmbeddings
 from retrieval.splitter import LangChainSplitter
@@ -16,11 +25,46 @@ from retrieval.splitter import LangChainSplitter
 # # setup loggers
 # logging.config.fileConfig("logging.conf", disable_existing_loggers=False)  # type: ignore
 # logger = logging.getLogger(__name__)
-app = FastAPI()
 
 
-def stream_chat(prompt: str):
-    for chunk in openai.ChatCompletion.create(
+async def init_index(cache: RedisVectorCache):
+    try:
+        await cache.init_index(vector_dimension=OpenAIEmbeddings.vector_dimension)
+        logger.info(f"Index {cache.settings.name} in use")
+    except Exception:
+        logger.exception("Could not initialize the vector index.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if VECTOR_CACHE_BACKEND == "local":
+        # In-process cache, no Redis needed
+        local_cache = LocalVectorCache(
+            OpenAIEmbeddings.vector_dimension, directory=VECTOR_CACHE_DIR
+        )
+        app.state.cache = local_cache
+        yield
+        local_cache.close()
+        return
+
+    # One connection pool for the whole app lifetime, shared by every request
+    pool = create_pool()
+    cache = RedisVectorCache(pool)
+    # await cache.init_test()
+    # Migrating to a new index can take a while; the old one keeps serving
+    # queries meanwhile, so the app doesn't wait for it to start
+    indexing = asyncio.create_task(init_index(cache))
+    app.state.cache = cache
+    yield
+    indexing.cancel()
+    await pool.disconnect()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def stream_chat(prompt: str):
+    async for chunk in await openai.ChatCompletion.acreate(
         model="gpt-3.5-turbo",
         temperature=0.0,
         messages=[{"role": "user", "content": prompt}],
@@ -31,8 +75,7 @@ def stream_chat(prompt: str):
             yield content
 
 
-async def event_generator(query) -> AsyncGenerator[dict, None]:
-    redis = RedisVectorCache(host="cache", port=6379)
+async def event_generator(query, cache: VectorDbCache) -> AsyncGenerator[dict, None]:
     embeddings = OpenAIEmbeddings()
     google = GoogleAPI()
     scraper = ScraperLocal()
@@ -41,17 +84,8 @@ async def event_generator(query) -> AsyncGenerator[dict, None]:
     # scraper = ScraperRemoteClient()
     # embeddings = RemoteEmbeddings()
 
-    # redis.init_test()
-    try:
-        redis.init_index(vector_dimension=embeddings.vector_dimension)
-        logger.info(
-            f"Created index with vector dimensions {embeddings.vector_dimension}"
-        )
-    except:
-        logger.info("Index already exists.")
-
     retriever = Retriever(
-        cache=redis,
+        cache=cache,
         searcher=google,
         scraper=scraper,
         embeddings=embeddings,
@@ -64,13 +98,13 @@ async def event_generator(query) -> AsyncGenerator[dict, None]:
 
             yield {"event": "prompt", "data": final_prompt}
 
-            for text in stream_chat(prompt=final_prompt):
+            async for text in stream_chat(prompt=final_prompt):
                 yield {"event": "token", "data": text}
 
 
 @app.get("/streamingSearch")
-async def main(query: str) -> EventSourceResponse:
-    return EventSourceResponse(event_generator(query))
+async def main(query: str, request: Request) -> EventSourceResponse:
+    return EventSourceResponse(event_generator(query, request.app.state.cache))
 
 
 if __name__ == "__main__":
@@ -1,9 +1,35 @@
+from typing import Annotated, Any, Optional
+import numpy as np
 from pydantic import BaseModel
-from typing import Optional
+from pydantic_core import core_schema
+
+
+def as_vector(value: Any) -> np.ndarray:
+    """Accepts packed float32 bytes, a NumPy array or a list of floats."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=np.float32)
+    return np.asarray(value, dtype=np.float32).reshape(-1)
+
+
+class Float32Vector:
+    """Validates a vector into a 1-D float32 array without a Python object per float."""
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any):
+        return core_schema.no_info_plain_validator_function(
+            as_vector,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda vector: vector.tolist()
+            ),
+        )
+
+
+Vector = Annotated[np.ndarray, Float32Vector]
 
 
 class Document(BaseModel):
     text: str
     url: str
-    vector: list[float]
+    # None when the cache was queried without vectors
+    vector: Optional[Vector] = None
     similarity: float
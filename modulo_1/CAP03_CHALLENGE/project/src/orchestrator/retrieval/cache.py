@@ -1,23 +1,75 @@
 from abc import ABC, abstractmethod
+import asyncio
+from dataclasses import dataclass
+import fcntl
 import hashlib
 import json
+import os
+import time
+from typing import Optional
 import numpy as np
 import pandas as pd
-import redis
+import redis.asyncio as aioredis
 from redis.commands.search.field import (
     TextField,
     VectorField,
 )
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
-from models.document import Document
+from redis.exceptions import ResponseError
+from models.document import Document, as_vector
 
 VECTOR_DIMENSION = 1536
+# Alias queried by the cache; it points at the index built with the current
+# IndexSettings, so the index can be rebuilt and swapped while serving
+INDEX_NAME = "idx:chunks_vss"
+# Similarity above which a new chunk is considered a duplicate of a cached one
+DUPLICATE_SIMILARITY = 0.97
+CHUNK_TTL = 3600
+
+REDIS_HOST = os.getenv("REDIS_HOST", "cache")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+# Maximum open connections; callers wait up to REDIS_POOL_TIMEOUT for a free one
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+
+# FLAT compares the query with every chunk; HNSW is an approximate graph index
+# whose query cost grows logarithmically with the number of chunks
+INDEX_ALGORITHM = os.getenv("REDIS_INDEX_ALGORITHM", "FLAT")
+# FLOAT16 halves the memory per vector (needs Redis Stack 7.4+)
+INDEX_VECTOR_TYPE = os.getenv("REDIS_INDEX_VECTOR_TYPE", "FLOAT32")
+HNSW_M = int(os.getenv("REDIS_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("REDIS_HNSW_EF_CONSTRUCTION", "200"))
+# Candidates explored per query; sent with every query, so changing it
+# doesn't require rebuilding the index
+HNSW_EF_RUNTIME = int(os.getenv("REDIS_HNSW_EF_RUNTIME", "10"))
+# Seconds between FT.INFO checks while a new index catches up
+INDEXING_POLL_INTERVAL = 1.0
+
+# "redis" or "local" (LocalVectorCache, in process); VECTOR_CACHE_DIR makes
+# the local cache persistent. The directory belongs to one process: with
+# several uvicorn workers use the Redis backend
+VECTOR_CACHE_BACKEND = os.getenv("VECTOR_CACHE_BACKEND", "redis")
+VECTOR_CACHE_DIR = os.getenv("VECTOR_CACHE_DIR")
+LOCAL_INITIAL_CAPACITY = 1024
+LOCAL_VECTORS_FILE = "vectors.f32"
+LOCAL_CHUNKS_FILE = "chunks.log"
+LOCAL_LOCK_FILE = "lock"
+
+# Chunks are hashes whose vector field holds the packed vector bytes; the
+# bytes depend on the vector type, so each type has its own key prefix
+KEY_PREFIXES = {"FLOAT32": "chunks:f32:", "FLOAT16": "chunks:f16:"}
+VECTOR_DTYPES = {"FLOAT32": np.float32, "FLOAT16": np.float16}
 
 
 class VectorDbCache(ABC):
     @abstractmethod
-    async def find_similar(self, vector: list[float], k=10) -> list[Document]:
+    async def find_similar(
+        self, vector: list[float], k=10, with_vectors=True
+    ) -> list[Document]:
+        """Returns the k nearest chunks; without vectors when with_vectors is False."""
         pass
 
     @abstractmethod
@@ -25,96 +77,587 @@ class VectorDbCache(ABC):
         pass
 
 
-SHA256 = hashlib.sha256()
+@dataclass(frozen=True)
+class IndexSettings:
+    algorithm: str = INDEX_ALGORITHM
+    vector_type: str = INDEX_VECTOR_TYPE
+    m: int = HNSW_M
+    ef_construction: int = HNSW_EF_CONSTRUCTION
+    ef_runtime: int = HNSW_EF_RUNTIME
 
+    def __post_init__(self):
+        object.__setattr__(self, "algorithm", self.algorithm.upper())
+        object.__setattr__(self, "vector_type", self.vector_type.upper())
+        if self.algorithm not in ("FLAT", "HNSW"):
+            raise ValueError(f"Unknown index algorithm: {self.algorithm}")
+        if self.vector_type not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector type: {self.vector_type}")
 
-class RedisVectorCache(VectorDbCache):
-    _pool = None
+    @property
+    def name(self) -> str:
+        """Name of the index behind the INDEX_NAME alias; one per build setting."""
+        name = f"{INDEX_NAME}:{self.algorithm.lower()}:{self.vector_type.lower()}"
+        if self.algorithm == "HNSW":
+            name += f":m{self.m}:ef{self.ef_construction}"
+        return name
 
-    def __init__(self, host, port) -> None:
-        if RedisVectorCache._pool is None:
-            RedisVectorCache._pool = redis.ConnectionPool(host=host, port=port)
+    @property
+    def key_prefix(self) -> str:
+        return KEY_PREFIXES[self.vector_type]
 
-        self.client = redis.Redis(
-            connection_pool=RedisVectorCache._pool, decode_responses=True
-        )
+    @property
+    def query_ef_runtime(self) -> Optional[int]:
+        return self.ef_runtime if self.algorithm == "HNSW" else None
 
-    async def find_similar(self, vector: list[float], k=10) -> list[Document]:
-        chunks = (
-            self.client.ft("idx:chunks_vss")
-            .search(
-                Query(f"(*)=>[KNN {k} @vector $query_vector AS vector_score]")
-                .sort_by("vector_score")
-                .return_fields("vector_score", "text", "url", "vector")
-                .dialect(2),
-                {"query_vector": np.array(vector, dtype=np.float32).tobytes()},
+    def vector_field(self, vector_dimension: int) -> VectorField:
+        attributes = {
+            "TYPE": self.vector_type,
+            "DIM": vector_dimension,
+            "DISTANCE_METRIC": "COSINE",
+        }
+        if self.algorithm == "HNSW":
+            attributes.update(
+                M=self.m,
+                EF_CONSTRUCTION=self.ef_construction,
+                EF_RUNTIME=self.ef_runtime,
             )
-            .docs  # type: ignore
-        )
-        documents = map(
-            lambda doc: Document(
-                url=doc.url,
-                text=doc.text,
-                vector=json.loads(doc.vector),
-                similarity=1 - float(doc.vector_score),
-            ),
-            chunks,
+        return VectorField("vector", self.algorithm, attributes)
+
+    def encode(self, vector) -> bytes:
+        return as_vector(vector).astype(VECTOR_DTYPES[self.vector_type]).tobytes()
+
+    def decode(self, blob: bytes) -> np.ndarray:
+        vector = np.frombuffer(blob, dtype=VECTOR_DTYPES[self.vector_type])
+        return vector.astype(np.float32, copy=False)
+
+
+def create_pool(
+    host: str = REDIS_HOST,
+    port: int = REDIS_PORT,
+    max_connections: int = REDIS_POOL_SIZE,
+    pool_timeout: float = REDIS_POOL_TIMEOUT,
+    connect_timeout: float = REDIS_CONNECT_TIMEOUT,
+    socket_timeout: float = REDIS_SOCKET_TIMEOUT,
+) -> aioredis.BlockingConnectionPool:
+    """Connection pool shared by every request; create it once at startup."""
+    return aioredis.BlockingConnectionPool(
+        host=host,
+        port=port,
+        max_connections=max_connections,
+        timeout=pool_timeout,
+        socket_connect_timeout=connect_timeout,
+        socket_timeout=socket_timeout,
+    )
+
+
+def chunk_key(text: str, prefix: str = KEY_PREFIXES["FLOAT32"]) -> str:
+    """Content-addressed key: the same chunk text always maps to the same key."""
+    return f"{prefix}{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+def knn_query(k: int, *fields: str, ef_runtime: Optional[int] = None) -> Query:
+    """KNN query; ef_runtime only applies to HNSW indexes."""
+    ef = f" EF_RUNTIME {ef_runtime}" if ef_runtime else ""
+    return (
+        Query(f"(*)=>[KNN {k} @vector $query_vector{ef} AS vector_score]")
+        .sort_by("vector_score")
+        # FT.SEARCH returns 10 results unless told otherwise
+        .paging(0, k)
+        .return_fields("vector_score", *fields)
+        .dialect(2)
+    )
+
+
+def search_args(query: Query, vector: bytes, index: str = INDEX_NAME) -> list:
+    """FT.SEARCH arguments, for queueing the query in an asyncio pipeline."""
+    return [index, *query.get_args(), "PARAMS", 2, "query_vector", vector]
+
+
+def to_text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def knn_hits(reply) -> list[dict]:
+    """Parses a raw FT.SEARCH reply into one {field: bytes} dict per hit.
+
+    redis-py's Result decodes every field as UTF-8, which would mangle the
+    packed vectors, so the reply is read directly.
+    """
+    return [
+        {to_text(name): value for name, value in zip(fields[::2], fields[1::2])}
+        for fields in reply[2::2]
+    ]
+
+
+def to_info(reply: dict) -> dict:
+    return {to_text(name): value for name, value in reply.items()}
+
+
+def key_prefixes(info: dict) -> list[str]:
+    """Key prefixes indexed by the index described by an FT.INFO reply."""
+    definition = info["index_definition"]
+    fields = {to_text(name): value for name, value in zip(definition[::2], definition[1::2])}
+    return [to_text(prefix) for prefix in fields.get("prefixes", [])]
+
+
+def unique_within_batch(documents: list[Document]) -> list[Document]:
+    """Drops chunks that are near-duplicates of an earlier chunk of the same batch.
+
+    Chunks without a vector come from find_similar(with_vectors=False), that
+    is, from the cache itself, so they are dropped as well.
+    """
+    documents = [document for document in documents if document.vector is not None]
+    if not documents:
+        return []
+    vectors = np.stack([as_vector(document.vector) for document in documents])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    unit = vectors / norms
+    similarity = unit @ unit.T
+
+    kept: list[int] = []
+    for i in range(len(documents)):
+        if not kept or similarity[i, kept].max() < DUPLICATE_SIMILARITY:
+            kept.append(i)
+    return [documents[i] for i in kept]
+
+
+class RedisVectorCache(VectorDbCache):
+    """Vector cache on Redis Stack through redis.asyncio.
+
+    Every command awaits the socket instead of blocking the event loop, so
+    concurrent requests share the pool's connections without serializing.
+    """
+
+    def __init__(
+        self, pool: aioredis.ConnectionPool, settings: Optional[IndexSettings] = None
+    ) -> None:
+        self.client = aioredis.Redis(connection_pool=pool)
+        self.settings = settings or IndexSettings()
+        # EF_RUNTIME sent with queries. Set by init_index once the alias points
+        # at the configured index: a FLAT index still in use during a
+        # migration rejects it
+        self.ef_runtime: Optional[int] = None
+
+    def hit_document(self, hit: dict) -> Document:
+        vector = hit.get("vector")
+        return Document(
+            text=to_text(hit["text"]),
+            url=to_text(hit["url"]),
+            vector=self.settings.decode(vector) if vector is not None else None,
+            similarity=1 - float(hit["vector_score"]),
         )
 
-        return list(documents)
+    def chunk_fields(self, text: str, url: str, vector) -> dict:
+        return {"text": text, "url": url, "vector": self.settings.encode(vector)}
+
+    async def find_similar(
+        self, vector: list[float], k=10, with_vectors=True
+    ) -> list[Document]:
+        fields = ("text", "url", "vector") if with_vectors else ("text", "url")
+        query = knn_query(k, *fields, ef_runtime=self.ef_runtime)
+        reply = await self.client.execute_command(
+            "FT.SEARCH", *search_args(query, self.settings.encode(vector))
+        )
+        return [self.hit_document(hit) for hit in knn_hits(reply)]
 
     async def get_insertables(self, documents: list[Document]) -> list[Document]:
+        """Returns the documents that are not near-duplicates of cached chunks.
+
+        Duplicates inside the batch are removed with a local similarity matrix,
+        and the remaining chunks are checked against the cache with one
+        pipelined KNN 1 query each, sent in a single round trip.
+        """
+        if not documents:
+            return []
+        candidates = unique_within_batch(documents)
+
+        pipeline = self.client.pipeline(transaction=False)
+        query = knn_query(1, ef_runtime=self.ef_runtime)
+        for document in candidates:
+            # AsyncSearch.search can't be queued in an asyncio pipeline, so the
+            # raw command is sent and the replies are parsed with knn_hits
+            pipeline.execute_command(
+                "FT.SEARCH", *search_args(query, self.settings.encode(document.vector))
+            )
+        replies = await pipeline.execute()
+
         insertables = []
-        for document in documents:
-            results = await self.find_similar(document.vector, k=1)
-            if not results:
-                insertables.append(document)
-            elif results[0].similarity < 0.97:
+        for document, reply in zip(candidates, replies):
+            nearest = knn_hits(reply)
+            if not nearest or 1 - float(nearest[0]["vector_score"]) < DUPLICATE_SIMILARITY:
                 insertables.append(document)
         return insertables
 
     async def write(self, documents: list[Document]):
         documents = await self.get_insertables(documents)
-        pipeline = self.client.pipeline()
+        if not documents:
+            return
+        pipeline = self.client.pipeline(transaction=False)
         for document in documents:
-            SHA256.update(document.text.encode("utf-8"))
-            chunk_id = SHA256.hexdigest()
-            redis_key = f"chunks:{chunk_id}"
-            document.similarity = -1
-            pipeline.json().set(redis_key, "$", document.model_dump())
-            pipeline.expire(redis_key, 3600)
+            redis_key = chunk_key(document.text, self.settings.key_prefix)
+            pipeline.hset(
+                redis_key,
+                mapping=self.chunk_fields(document.text, document.url, document.vector),
+            )
+            pipeline.expire(redis_key, CHUNK_TTL)
 
-        pipeline.execute()
+        await pipeline.execute()
 
-    def init_test(self):
+    async def init_test(self):
         df = pd.read_pickle("mocks/database_pickle")
-        df["vector"] = df["vector"].apply(lambda x: x.tolist()[0])
         chunks = df.to_dict("records")
 
-        pipeline = self.client.pipeline()
+        pipeline = self.client.pipeline(transaction=False)
         for chunk in chunks:
-            SHA256.update(chunk["text"].encode("utf-8"))
-            chunk_id = SHA256.hexdigest()
-            redis_key = f"chunks:{chunk_id}"
-            pipeline.json().set(redis_key, "$", chunk)
-        pipeline.execute()
-
-    def init_index(self, vector_dimension):
-        schema = (
-            TextField("$.text", no_stem=True, as_name="text"),
-            TextField("$.url", no_stem=True, as_name="url"),
-            VectorField(
-                "$.vector",
-                "FLAT",
-                {
-                    "TYPE": "FLOAT32",
-                    "DIM": vector_dimension,
-                    "DISTANCE_METRIC": "COSINE",
-                },
-                as_name="vector",
-            ),
+            pipeline.hset(
+                chunk_key(chunk["text"], self.settings.key_prefix),
+                mapping=self.chunk_fields(chunk["text"], chunk["url"], chunk["vector"]),
+            )
+        await pipeline.execute()
+
+    async def index_info(self, name: str) -> Optional[dict]:
+        """FT.INFO of an index or alias, or None if it doesn't exist."""
+        try:
+            return to_info(await self.client.ft(name).info())
+        except ResponseError:
+            return None
+
+    async def wait_indexed(self, name: str):
+        """Waits until Redis has indexed the chunks that existed at creation."""
+        while True:
+            info = await self.index_info(name)
+            if info is None or float(to_text(info["percent_indexed"])) >= 1:
+                return
+            await asyncio.sleep(INDEXING_POLL_INTERVAL)
+
+    async def init_index(self, vector_dimension):
+        """Points the INDEX_NAME alias at an index built with self.settings.
+
+        If another index is in use (a FLAT index when HNSW is configured, or
+        different HNSW parameters) the new one is created next to it and
+        Redis fills it from the existing chunks in the background. Queries
+        keep using the old index until the new one has caught up; then the
+        alias is switched and the old index dropped, keeping its chunks.
+
+        A different vector type means different keys, so the new index starts
+        empty, the alias is switched at once and the old chunks expire.
+        """
+        target = self.settings.name
+        current = await self.index_info(INDEX_NAME)
+        current_name = to_text(current["index_name"]) if current else None
+        if current_name == target:
+            self.ef_runtime = self.settings.query_ef_runtime
+            return
+
+        if await self.index_info(target) is None:
+            schema = (
+                TextField("text", no_stem=True),
+                TextField("url", no_stem=True),
+                self.settings.vector_field(vector_dimension),
+            )
+            definition = IndexDefinition(
+                prefix=[self.settings.key_prefix], index_type=IndexType.HASH
+            )
+            await self.client.ft(target).create_index(
+                fields=schema, definition=definition
+            )
+        if current is not None and self.settings.key_prefix in key_prefixes(current):
+            await self.wait_indexed(target)
+
+        if current_name is None:
+            await self.client.ft(target).aliasadd(INDEX_NAME)
+        elif current_name == INDEX_NAME:
+            # Index created before the alias existed: an alias can't share its
+            # name, so queries fail between these two commands
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.execute_command("FT.DROPINDEX", INDEX_NAME)
+            pipeline.execute_command("FT.ALIASADD", INDEX_NAME, target)
+            await pipeline.execute()
+        else:
+            await self.client.ft(target).aliasupdate(INDEX_NAME)
+            await self.client.ft(current_name).dropindex(delete_documents=False)
+        self.ef_runtime = self.settings.query_ef_runtime
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k highest finite scores, best first."""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    rows = np.argpartition(-scores, k - 1)[:k]
+    rows = rows[np.argsort(-scores[rows])]
+    return rows[np.isfinite(scores[rows])]
+
+
+class LocalVectorCache(VectorDbCache):
+    """In-process vector cache for development, tests and small deployments.
+
+    The vectors live in one contiguous float32 matrix (a row per chunk) and
+    a query is a single matrix product plus argpartition, run in a worker
+    thread so the event loop keeps serving. Chunks expire CHUNK_TTL seconds
+    after they are written, like the Redis keys; expired rows are skipped by
+    queries and reused by later writes.
+
+    With a directory the matrix is a memory-mapped file and the chunk text,
+    url and expiry of each row go to an append-only log, so the cache
+    survives restarts. Only one process can open a directory at a time:
+    another one (e.g. a second uvicorn worker) fails with RuntimeError.
+    """
+
+    def __init__(
+        self,
+        vector_dimension: int = VECTOR_DIMENSION,
+        directory: Optional[str] = None,
+        ttl: float = CHUNK_TTL,
+        clock=time.time,
+    ) -> None:
+        self.dimension = vector_dimension
+        self.directory = directory
+        self.ttl = ttl
+        # Wall clock, so expiry times stay valid across restarts
+        self.clock = clock
+        # Rows ever used; rows past it are unused capacity
+        self.size = 0
+        self.matrix = np.zeros((0, vector_dimension), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        # Expiry time per row; 0 marks a free row
+        self.expires = np.zeros(0, dtype=np.float64)
+        self.keys: list[Optional[str]] = []
+        self.texts: list[str] = []
+        self.urls: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.free: list[int] = []
+        self.log = None
+        self.logged = 0
+        self.lock = None
+        if directory:
+            self.open()
+        else:
+            self.grow(LOCAL_INITIAL_CAPACITY)
+
+    # ----------- Storage -----------
+
+    def vectors_path(self) -> str:
+        return os.path.join(self.directory, LOCAL_VECTORS_FILE)
+
+    def chunks_path(self) -> str:
+        return os.path.join(self.directory, LOCAL_CHUNKS_FILE)
+
+    def map_vectors(self, path: str, capacity: int, mode: str) -> np.memmap:
+        return np.memmap(path, dtype=np.float32, mode=mode, shape=(capacity, self.dimension))
+
+    def grow(self, capacity: int):
+        """Resizes every per-row array to ``capacity`` rows, keeping the used ones."""
+        if self.directory:
+            tmp_path = self.vectors_path() + ".tmp"
+            matrix = self.map_vectors(tmp_path, capacity, "w+")
+            matrix[: self.size] = self.matrix[: self.size]
+            matrix.flush()
+            os.replace(tmp_path, self.vectors_path())
+        else:
+            matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+            matrix[: self.size] = self.matrix[: self.size]
+        # A query running in a worker thread keeps its reference to the old
+        # matrix, which stays valid until it's released
+        self.matrix = matrix
+        padding = np.zeros(capacity - self.size)
+        self.norms = np.concatenate([self.norms[: self.size], padding]).astype(np.float32)
+        self.expires = np.concatenate([self.expires[: self.size], padding])
+        padding = capacity - len(self.keys)
+        self.keys += [None] * padding
+        self.texts += [""] * padding
+        self.urls += [""] * padding
+
+    def open(self):
+        """Maps the stored vectors and replays the chunk log."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Two processes appending to the same log and matrix would corrupt them
+        self.lock = open(os.path.join(self.directory, LOCAL_LOCK_FILE), "w")
+        try:
+            fcntl.flock(self.lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock.close()
+            self.lock = None
+            raise RuntimeError(f"{self.directory} is in use by another process")
+        capacity = LOCAL_INITIAL_CAPACITY
+        if os.path.exists(self.vectors_path()):
+            row_bytes = 4 * self.dimension
+            capacity = max(os.path.getsize(self.vectors_path()) // row_bytes, 1)
+            self.matrix = self.map_vectors(self.vectors_path(), capacity, "r+")
+            self.norms = np.zeros(capacity, dtype=np.float32)
+            self.expires = np.zeros(capacity)
+            self.keys = [None] * capacity
+            self.texts = [""] * capacity
+            self.urls = [""] * capacity
+        else:
+            self.grow(capacity)
+
+        if os.path.exists(self.chunks_path()):
+            with open(self.chunks_path(), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row, text, url, expires = json.loads(line)
+                    except ValueError:
+                        # Line cut short by a crash
+                        break
+                    if row >= capacity:
+                        continue
+                    self.set_row(row, text, url, expires)
+                    self.size = max(self.size, row + 1)
+
+        self.norms[: self.size] = np.linalg.norm(self.matrix[: self.size], axis=1)
+        now = self.clock()
+        self.free = [
+            row for row in range(self.size - 1, -1, -1) if self.expires[row] <= now
+        ]
+        for row in self.free:
+            self.release(row)
+        self.rewrite_log()
+
+    def rewrite_log(self):
+        """Rewrites the chunk log with only the live rows."""
+        if self.log is not None:
+            self.log.close()
+        tmp_path = self.chunks_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in range(self.size):
+                if self.keys[row] is not None:
+                    f.write(self.log_line(row))
+        os.replace(tmp_path, self.chunks_path())
+        self.logged = len(self.rows)
+        self.log = open(self.chunks_path(), "a", encoding="utf-8")
+
+    def log_line(self, row: int) -> str:
+        record = [row, self.texts[row], self.urls[row], float(self.expires[row])]
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+        if isinstance(self.matrix, np.memmap):
+            self.matrix.flush()
+        if self.lock is not None:
+            self.lock.close()
+            self.lock = None
+
+    # ----------- Rows -----------
+
+    def set_row(self, row: int, text: str, url: str, expires: float):
+        key = chunk_key(text)
+        self.rows.pop(self.keys[row], None)
+        self.keys[row] = key
+        self.texts[row] = text
+        self.urls[row] = url
+        self.expires[row] = expires
+        self.rows[key] = row
+
+    def release(self, row: int):
+        self.rows.pop(self.keys[row], None)
+        self.keys[row] = None
+        self.texts[row] = self.urls[row] = ""
+        self.expires[row] = 0
+
+    def evict_expired(self):
+        """Frees the rows of expired chunks so that writes reuse them."""
+        expired = np.flatnonzero(
+            (self.expires[: self.size] > 0) & (self.expires[: self.size] <= self.clock())
         )
-        definition = IndexDefinition(prefix=["chunks:"], index_type=IndexType.JSON)
-        self.client.ft("idx:chunks_vss").create_index(
-            fields=schema, definition=definition
+        for row in expired:
+            self.release(int(row))
+        self.free.extend(int(row) for row in expired[::-1])
+
+    def allocate(self) -> int:
+        if self.free:
+            return self.free.pop()
+        if self.size == len(self.expires):
+            self.grow(2 * len(self.expires))
+        self.size += 1
+        return self.size - 1
+
+    def put(self, text: str, url: str, vector: np.ndarray, expires: float):
+        # The same text overwrites its chunk, like HSET on the same key
+        row = self.rows.get(chunk_key(text))
+        if row is None:
+            row = self.allocate()
+        self.matrix[row] = vector
+        self.norms[row] = np.linalg.norm(vector)
+        self.set_row(row, text, url, expires)
+        if self.log is not None:
+            self.log.write(self.log_line(row))
+            self.logged += 1
+
+    # ----------- Queries -----------
+
+    def unit(self, vectors: list) -> np.ndarray:
+        matrix = np.stack([as_vector(vector) for vector in vectors])
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dimension}, got {matrix.shape[1]}"
+            )
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def similarities(self, queries: np.ndarray, size: Optional[int] = None) -> np.ndarray:
+        """Cosine similarity of the first ``size`` rows (all used rows by
+        default) to every unit query, (rows, queries).
+
+        Free and expired rows score -inf.
+        """
+        size = self.size if size is None else size
+        norms = self.norms[:size].copy()
+        norms[norms == 0] = 1
+        scores = (self.matrix[:size] @ queries.T) / norms[:, None]
+        scores[self.expires[:size] <= self.clock()] = -np.inf
+        return scores
+
+    async def find_similar(
+        self, vector: list[float], k=10, with_vectors=True
+    ) -> list[Document]:
+        # Writes can run while the query is in the worker thread; rows whose
+        # chunk changed meanwhile are dropped instead of mixing two chunks
+        size = self.size
+        keys, texts, urls = self.keys[:size], self.texts[:size], self.urls[:size]
+        scores = (await asyncio.to_thread(self.similarities, self.unit([vector]), size))[:, 0]
+        return [
+            Document(
+                text=texts[row],
+                url=urls[row],
+                vector=self.matrix[row].copy() if with_vectors else None,
+                similarity=float(scores[row]),
+            )
+            for row in top_k(scores, k)
+            if self.keys[row] == keys[row]
+        ]
+
+    async def get_insertables(self, documents: list[Document]) -> list[Document]:
+        """Same rule as RedisVectorCache.get_insertables, with one matrix product."""
+        if not documents:
+            return []
+        candidates = unique_within_batch(documents)
+        if not candidates or not self.size:
+            return candidates
+        scores = await asyncio.to_thread(
+            self.similarities, self.unit([document.vector for document in candidates])
         )
+        nearest = scores.max(axis=0)
+        return [
+            document
+            for document, similarity in zip(candidates, nearest)
+            if similarity < DUPLICATE_SIMILARITY
+        ]
+
+    async def write(self, documents: list[Document]):
+        documents = await self.get_insertables(documents)
+        # Sweeping on every write keeps self.rows down to live chunks, which
+        # the log compaction below relies on
+        self.evict_expired()
+        expires = self.clock() + self.ttl
+        for document in documents:
+            self.put(document.text, document.url, as_vector(document.vector), expires)
+        if self.log is not None:
+            self.log.flush()
+            if self.logged > 2 * max(len(self.rows), LOCAL_INITIAL_CAPACITY):
+                self.rewrite_log()
@@ -36,7 +36,10 @@ class Retriever:
         """Generates context based on query. It can retrieve from cache or from internet."""
 
         query_vector = await self.embeddings.run([query])
-        documents = await self.cache.find_similar(query_vector[0], k)
+        # Only text, url and similarity are used, so vectors aren't fetched
+        documents = await self.cache.find_similar(
+            query_vector[0], k, with_vectors=False
+        )
         quality_cache = await self.evaluate_retrieval(documents, cache_treshold)
 
         logger.info(f"QUALITY CACHE: {quality_cache}")
@@ -111,7 +114,7 @@ class Retriever:
         df["vector"] = df["vector"].apply(lambda x: np.array(x).reshape(1, -1))
         df["similarity"] = df["vector"].apply(compute_cosine_similarity)
         similar = df.nlargest(k, "similarity")[["text", "url", "vector", "similarity"]]
-        similar["vector"] = similar["vector"].apply(lambda x: x[0].tolist())
+        similar["vector"] = similar["vector"].apply(lambda x: x[0])
 
         json_docs = similar.to_dict("records")
 
@@ -0,0 +1,14 @@
+import os
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The orchestrator imports its modules from src/orchestrator (the Docker
+# image's working directory) and reads its settings from the environment
+sys.path.insert(0, os.path.join(PROJECT_DIR, "src", "orchestrator"))
+
+with open(os.path.join(PROJECT_DIR, ".env.example"), encoding="utf-8") as env:
+    for line in env:
+        name, _, value = line.strip().partition("=")
+        if name and not name.startswith("#"):
+            os.environ.setdefault(name, value.strip('"'))
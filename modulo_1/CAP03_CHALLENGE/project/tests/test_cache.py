@@ -0,0 +1,220 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from retrieval import cache as cache_module
+from retrieval.cache import (
+    CHUNK_TTL,
+    INDEX_NAME,
+    IndexSettings,
+    RedisVectorCache,
+    create_pool,
+    knn_query,
+    unique_within_batch,
+)
+from models.document import Document
+
+DIMENSION = 4
+
+
+class FakeSearch:
+    def __init__(self, redis, name):
+        self.redis = redis
+        self.name = name
+
+    async def info(self):
+        name = self.redis.aliases.get(self.name, self.name)
+        if name not in self.redis.indexes:
+            raise cache_module.ResponseError("Unknown index name")
+        return {"index_name": name, **self.redis.indexes[name]}
+
+    async def create_index(self, fields, definition):
+        self.redis.indexes[self.name] = {
+            "index_definition": ["key_type", "HASH", "prefixes", definition.args[3:4]],
+            "percent_indexed": "0",
+        }
+        self.redis.created.set()
+
+    async def aliasadd(self, alias):
+        self.redis.aliases[alias] = self.name
+
+    async def aliasupdate(self, alias):
+        self.redis.aliases[alias] = self.name
+
+    async def dropindex(self, delete_documents=False):
+        del self.redis.indexes[self.name]
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def execute_command(self, *args):
+        self.commands.append(self.redis.execute_command(*args))
+
+    def hset(self, key, mapping):
+        self.redis.hashes[key] = dict(mapping)
+
+    def expire(self, key, seconds):
+        self.redis.ttls[key] = seconds
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [await command for command in self.commands]
+
+
+class FakeRedis:
+    """In-memory stand-in for the FT.* commands RedisVectorCache sends."""
+
+    def __init__(self):
+        self.indexes = {}
+        self.aliases = {}
+        self.searches = []
+        self.hits = []
+        self.hashes = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.created = asyncio.Event()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def ft(self, name):
+        return FakeSearch(self, name)
+
+    async def execute_command(self, *args):
+        assert args[0] == "FT.SEARCH"
+        self.searches.append(args)
+        reply = [len(self.hits)]
+        for key, fields in self.hits:
+            reply += [key, [item for pair in fields.items() for item in pair]]
+        return reply
+
+
+def redis_cache(settings):
+    cache = RedisVectorCache(create_pool(host="localhost"), settings)
+    cache.client = FakeRedis()
+    return cache
+
+
+def test_knn_query_returns_k_results():
+    args = knn_query(25, "text").get_args()
+    assert args[args.index("LIMIT"):] == ["LIMIT", 0, 25]
+
+
+def test_migration_keeps_serving_from_flat_index(monkeypatch):
+    monkeypatch.setattr(cache_module, "INDEXING_POLL_INTERVAL", 0.01)
+
+    async def scenario():
+        flat = IndexSettings(algorithm="FLAT", vector_type="FLOAT32")
+        hnsw = IndexSettings(algorithm="HNSW", vector_type="FLOAT32", ef_runtime=40)
+        cache = redis_cache(hnsw)
+        redis = cache.client
+        redis.indexes[flat.name] = {
+            "index_definition": ["key_type", "HASH", "prefixes", [flat.key_prefix]],
+            "percent_indexed": "1",
+        }
+        redis.aliases[INDEX_NAME] = flat.name
+
+        migration = asyncio.create_task(cache.init_index(DIMENSION))
+        await redis.created.wait()
+
+        # Mid-migration: the alias still points at the FLAT index
+        await cache.find_similar([0.1] * DIMENSION, k=3)
+        await cache.get_insertables(
+            [cache_module.Document(text="t", url="u", vector=[1.0] * DIMENSION, similarity=0)]
+        )
+        assert redis.aliases[INDEX_NAME] == flat.name
+        assert all("EF_RUNTIME" not in args[2] for args in redis.searches)
+
+        redis.indexes[hnsw.name]["percent_indexed"] = "1"
+        await migration
+        assert redis.aliases[INDEX_NAME] == hnsw.name
+        assert flat.name not in redis.indexes
+
+        await cache.find_similar([0.1] * DIMENSION, k=3)
+        assert "EF_RUNTIME 40" in redis.searches[-1][2]
+
+    asyncio.run(scenario())
+
+
+def test_vectors_round_trip_as_packed_bytes():
+    cache = redis_cache(IndexSettings(algorithm="FLAT", vector_type="FLOAT32"))
+    vector = np.array([0.5, -1.25, 3.0, 0.0], dtype=np.float32)
+    fields = cache.chunk_fields("text", "url", vector.tolist())
+    assert fields["vector"] == vector.tobytes()
+
+    document = cache.hit_document({**fields, "vector_score": "0.25"})
+    assert document.vector.dtype == np.float32
+    assert np.array_equal(document.vector, vector)
+    assert document.similarity == 0.75
+    assert Document(text="t", url="u", vector=vector.tobytes(), similarity=0).vector.tolist() == vector.tolist()
+
+
+def test_find_similar_without_vectors():
+    async def scenario():
+        cache = redis_cache(IndexSettings(algorithm="FLAT", vector_type="FLOAT32"))
+        cache.client.hits = [("chunks:f32:1", {"text": "t", "url": "u", "vector_score": "0.1"})]
+        documents = await cache.find_similar([0.1] * DIMENSION, with_vectors=False)
+        args = cache.client.searches[-1]
+        assert "vector" not in args[args.index("RETURN"):]
+        assert [document.vector for document in documents] == [None]
+
+        # Chunks read without vectors come from the cache: writing them back is a no-op
+        await cache.write(documents)
+        assert cache.client.hashes == {}
+
+    asyncio.run(scenario())
+
+
+def test_unique_within_batch_skips_documents_without_vector():
+    documents = [
+        Document(text="a", url="u", vector=None, similarity=0),
+        Document(text="b", url="u", vector=[1.0, 0.0, 0.0, 0.0], similarity=0),
+        Document(text="c", url="u", vector=[1.0, 0.001, 0.0, 0.0], similarity=0),
+        Document(text="d", url="u", vector=[0.0, 1.0, 0.0, 0.0], similarity=0),
+    ]
+    assert [document.text for document in unique_within_batch(documents)] == ["b", "d"]
+    assert unique_within_batch(documents[:1]) == []
+
+
+def test_write_checks_and_stores_batch_in_pipelines():
+    async def scenario():
+        settings = IndexSettings(algorithm="FLAT", vector_type="FLOAT32")
+        cache = redis_cache(settings)
+        redis = cache.client
+        documents = [
+            Document(text="a", url="u", vector=[1.0, 0.0, 0.0, 0.0], similarity=0),
+            Document(text="a'", url="u", vector=[1.0, 0.01, 0.0, 0.0], similarity=0),
+            Document(text="b", url="u", vector=[0.0, 1.0, 0.0, 0.0], similarity=0),
+        ]
+        await cache.write(documents)
+
+        # One KNN 1 query per chunk left after the in-batch dedup, then one
+        # HSET + EXPIRE per chunk: two round trips in total
+        assert len(redis.searches) == 2
+        assert redis.round_trips == 2
+        keys = [cache_module.chunk_key(text, settings.key_prefix) for text in ("a", "b")]
+        assert sorted(redis.hashes) == sorted(keys)
+        assert redis.ttls == {key: CHUNK_TTL for key in keys}
+
+        # Chunks whose nearest cached chunk is a near-duplicate are skipped
+        redis.hashes.clear()
+        redis.hits = [("chunks:f32:1", {"vector_score": "0.01"})]
+        await cache.write(documents)
+        assert redis.hashes == {}
+
+    asyncio.run(scenario())
+
+
+def test_pool_is_shared_and_bounded():
+    pool = create_pool(host="localhost", max_connections=7, pool_timeout=1.5)
+    assert isinstance(pool, cache_module.aioredis.BlockingConnectionPool)
+    assert pool.max_connections == 7
+    assert pool.timeout == 1.5
+
+    first = RedisVectorCache(pool)
+    second = RedisVectorCache(pool)
+    assert first.client.connection_pool is second.client.connection_pool is pool
@@ -0,0 +1,135 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from retrieval.cache import LOCAL_INITIAL_CAPACITY, LocalVectorCache
+from models.document import Document
+
+DIMENSION = 4
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def document(text, *vector):
+    return Document(text=text, url=f"https://example.com/{text}", vector=list(vector), similarity=0)
+
+
+def texts(documents):
+    return [document.text for document in documents]
+
+
+def test_chunks_expire_after_ttl():
+    clock = Clock()
+    cache = LocalVectorCache(DIMENSION, ttl=10, clock=clock)
+
+    async def scenario():
+        await cache.write([document("a", 1, 0, 0, 0), document("b", 0, 1, 0, 0)])
+        found = await cache.find_similar([1, 0.1, 0, 0], k=5)
+        assert texts(found) == ["a", "b"]
+        assert found[0].url == "https://example.com/a"
+        assert np.array_equal(found[0].vector, [1, 0, 0, 0])
+        assert (await cache.find_similar([1, 0, 0, 0], with_vectors=False))[0].vector is None
+
+        clock.now += 11
+        assert await cache.find_similar([1, 0, 0, 0]) == []
+        # An expired chunk no longer counts as a duplicate
+        assert texts(await cache.get_insertables([document("c", 1, 0, 0, 0)])) == ["c"]
+
+    asyncio.run(scenario())
+
+
+def test_writes_reuse_expired_rows():
+    clock = Clock()
+    cache = LocalVectorCache(DIMENSION, ttl=10, clock=clock)
+
+    async def scenario():
+        await cache.write([document("a", 1, 0, 0, 0), document("b", 0, 1, 0, 0)])
+        clock.now += 5
+        await cache.write([document("c", 0, 0, 1, 0)])
+        clock.now += 6
+        # "a" and "b" expired; a write with nothing to insert still frees them
+        await cache.write([document("c", 0, 0, 1, 0.01)])
+        assert sorted(cache.free) == [0, 1]
+        assert len(cache.rows) == 1
+
+        await cache.write([document("d", 0, 0, 0, 1), document("e", 1, 1, 0, 0)])
+        assert cache.size == 3
+        assert texts(await cache.find_similar([1, 1, 1, 0.5], k=5)) == ["e", "c", "d"]
+
+    asyncio.run(scenario())
+
+
+def test_persistent_cache_survives_reopen(tmp_path):
+    clock = Clock()
+    cache = LocalVectorCache(DIMENSION, directory=str(tmp_path), ttl=10, clock=clock)
+
+    async def scenario(cache):
+        await cache.write([document("a", 1, 0, 0, 0), document("b", 0, 1, 0, 0)])
+        clock.now += 5
+        await cache.write([document("c", 0, 0, 1, 0)])
+
+    asyncio.run(scenario(cache))
+    cache.close()
+
+    clock.now += 6
+    reopened = LocalVectorCache(DIMENSION, directory=str(tmp_path), ttl=10, clock=clock)
+    found = asyncio.run(reopened.find_similar([0, 0, 1, 0], k=5))
+    assert texts(found) == ["c"]
+    assert np.array_equal(found[0].vector, [0, 0, 1, 0])
+    # The expired rows are free again and the log only keeps "c"
+    assert sorted(reopened.free) == [0, 1]
+    assert len((tmp_path / "chunks.log").read_text().splitlines()) == 1
+    reopened.close()
+
+
+def test_chunk_log_is_compacted(tmp_path):
+    clock = Clock()
+    cache = LocalVectorCache(DIMENSION, directory=str(tmp_path), ttl=10, clock=clock)
+
+    async def scenario():
+        for i in range(2 * LOCAL_INITIAL_CAPACITY + 1):
+            clock.now += 11
+            await cache.write([document(f"chunk {i}", 1, 0, 0, 0)])
+
+    # Every write appends a line, reusing the row of the expired chunk, until
+    # the log is rewritten with only the live one
+    asyncio.run(scenario())
+    assert cache.size == 1
+    assert len((tmp_path / "chunks.log").read_text().splitlines()) == 1
+    cache.close()
+
+
+def test_directory_is_locked_by_one_process(tmp_path):
+    cache = LocalVectorCache(DIMENSION, directory=str(tmp_path))
+    with pytest.raises(RuntimeError):
+        LocalVectorCache(DIMENSION, directory=str(tmp_path))
+    cache.close()
+    LocalVectorCache(DIMENSION, directory=str(tmp_path)).close()
+
+
+def test_find_similar_drops_rows_rewritten_during_query():
+    clock = Clock()
+    cache = LocalVectorCache(DIMENSION, ttl=10, clock=clock)
+    similarities = cache.similarities
+
+    def overwritten(queries, size):
+        # A write lands while the query runs in the worker thread
+        scores = similarities(queries, size)
+        cache.release(0)
+        cache.free.append(0)
+        cache.put("b", "https://example.com/b", np.array([0, 1, 0, 0], dtype=np.float32), clock() + 10)
+        return scores
+
+    async def scenario():
+        await cache.write([document("a", 1, 0, 0, 0)])
+        cache.similarities = overwritten
+        assert await cache.find_similar([1, 0, 0, 0]) == []
+
+    asyncio.run(scenario())